@@ -0,0 +1,61 @@
+"""
+Optional acceleration dependencies for the diagnosis engine.
+
+Each optional package is probed exactly once, here, so engine modules can
+branch on a flag instead of repeating their own try/except ImportError blocks.
+Everything degrades to the pure-Python path when a package is missing.
+"""
+
+import json
+import logging
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class _OptionalDeps(NamedTuple):
+    numba: bool
+    ahocorasick: bool
+    orjson: bool
+
+
+_OPTIONAL_DEPS = _OptionalDeps(
+    numba=numba is not None,
+    ahocorasick=ahocorasick is not None,
+    orjson=orjson is not None,
+)
+
+HAS_NUMBA = _OPTIONAL_DEPS.numba
+HAS_AHOCORASICK = _OPTIONAL_DEPS.ahocorasick
+HAS_ORJSON = _OPTIONAL_DEPS.orjson
+
+if HAS_NUMBA:
+    njit = numba.njit
+else:
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit, usable bare or with arguments"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+json_loads = orjson.loads if HAS_ORJSON else json.loads
+
+logger.info(
+    "Diagnosis engine accelerations: numba=%s, pyahocorasick=%s, orjson=%s",
+    HAS_NUMBA, HAS_AHOCORASICK, HAS_ORJSON,
+)
@@ -1,7 +1,12 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set
 import json
 from datetime import datetime
 
+from medical_knowledge._matcher import TermMatcher
+
+# Headache location phrases that map to a bilateral presentation
+_BILATERAL_TERMS = ("both", "all over", "whole")
+
 class CrossSymptomAnalyzer:
     """
     Analyzes symptoms across different complaint categories to provide 
@@ -10,6 +15,26 @@ class CrossSymptomAnalyzer:
     
     def __init__(self):
         self.diagnostic_knowledge_base = self._load_diagnostic_knowledge()
+        self._index_condition_symptoms()
+        self._standard_symptoms = tuple(self.diagnostic_knowledge_base["symptom_mappings"])
+        self._symptom_matcher = self._build_symptom_matcher()
+    
+    def _build_symptom_matcher(self) -> TermMatcher:
+        """Matcher over symptom variations; bit i stands for the i-th standard symptom"""
+        # Several standard symptoms share a variation (e.g. "worst ever"), so a
+        # variation carries the bits of every standard symptom it implies
+        return TermMatcher(
+            (variation, 1 << i)
+            for i, variations in enumerate(self.diagnostic_knowledge_base["symptom_mappings"].values())
+            for variation in variations
+        )
+    
+    def _index_condition_symptoms(self) -> None:
+        """Precompute frozensets of each condition's symptom lists for set-based matching"""
+        for condition_data in self.diagnostic_knowledge_base["conditions"].values():
+            condition_data["_required_set"] = frozenset(condition_data["required_symptoms"])
+            condition_data["_supporting_set"] = frozenset(condition_data.get("supporting_symptoms", []))
+            condition_data["_red_flag_set"] = frozenset(condition_data.get("red_flags", []))
     
     def _load_diagnostic_knowledge(self) -> Dict[str, Any]:
         """Load comprehensive diagnostic knowledge base"""
@@ -416,12 +441,14 @@ class CrossSymptomAnalyzer:
         standardized = []
         
         for raw_symptom in raw_symptoms:
-            raw_lower = raw_symptom.lower()
-            
-            for standard_symptom, variations in self.diagnostic_knowledge_base["symptom_mappings"].items():
-                if any(variation in raw_lower for variation in variations):
-                    if standard_symptom not in standardized:
-                        standardized.append(standard_symptom)
+            mask = self._symptom_matcher.scan(raw_symptom.lower())
+            # Lowest bit first, so symptoms come out in mapping order
+            while mask:
+                lowest = mask & -mask
+                standard_symptom = self._standard_symptoms[lowest.bit_length() - 1]
+                if standard_symptom not in standardized:
+                    standardized.append(standard_symptom)
+                mask ^= lowest
         
         return standardized
     
@@ -617,17 +644,17 @@ class CrossSymptomAnalyzer:
                 collected_symptoms.append("worst_ever_headache")
             
             # Add location information
-            location = headache_data.get("location")
-            if location and "one side" in location.lower():
+            loc_lc = (headache_data.get("location") or "").lower()
+            if "one side" in loc_lc:
                 collected_symptoms.append("unilateral_headache")
-            elif location and any(term in location.lower() for term in ["both", "all over", "whole"]):
+            elif any(term in loc_lc for term in _BILATERAL_TERMS):
                 collected_symptoms.append("bilateral_headache")
             
             # Add character information
-            character = headache_data.get("character")
-            if character and "throbbing" in character.lower():
+            char_lc = (headache_data.get("character") or "").lower()
+            if "throbbing" in char_lc:
                 collected_symptoms.append("throbbing_pain")
-            elif character and "pressure" in character.lower():
+            elif "pressure" in char_lc:
                 collected_symptoms.append("pressure_pain")
             
             # Add associated symptoms
@@ -661,6 +688,8 @@ class CrossSymptomAnalyzer:
         # Standardize symptoms
         standardized_symptoms = self.standardize_symptoms(collected_symptoms)
         
+        symptoms_set = frozenset(standardized_symptoms)
+        
         # Calculate diagnostic scores for all conditions
         diagnostic_results = []
         
@@ -674,7 +703,7 @@ class CrossSymptomAnalyzer:
                     "priority": condition_data["priority"],
                     "icd10": condition_data["icd10"],
                     "description": condition_data["description"],
-                    "reasoning": self._generate_reasoning(condition_data, standardized_symptoms, demographics),
+                    "reasoning": self._generate_reasoning(condition_data, symptoms_set, demographics),
                     "next_steps": self._get_next_steps(condition_data["priority"], score)
                 })
         
@@ -682,23 +711,28 @@ class CrossSymptomAnalyzer:
         diagnostic_results.sort(key=lambda x: x["probability"], reverse=True)
         return diagnostic_results[:5]
     
-    def _generate_reasoning(self, condition: Dict[str, Any], symptoms: List[str], 
+    def _generate_reasoning(self, condition: Dict[str, Any], symptoms_set: frozenset, 
                           demographics: Dict[str, Any]) -> str:
         """Generate reasoning for why this diagnosis is considered"""
         reasons = []
         
+        # Set intersections decide membership; the condition's own list order is
+        # kept for display so the reasoning text stays deterministic.
         # Required symptoms
-        met_required = [req for req in condition["required_symptoms"] if req in symptoms]
+        met = condition["_required_set"] & symptoms_set
+        met_required = [req for req in condition["required_symptoms"] if req in met]
         if met_required:
             reasons.append(f"Meets required criteria: {', '.join(met_required)}")
         
         # Supporting symptoms
-        met_supporting = [sup for sup in condition.get("supporting_symptoms", []) if sup in symptoms]
+        met = condition["_supporting_set"] & symptoms_set
+        met_supporting = [sup for sup in condition.get("supporting_symptoms", []) if sup in met]
         if met_supporting:
             reasons.append(f"Supporting symptoms present: {', '.join(met_supporting[:3])}")
         
         # Red flags
-        met_red_flags = [flag for flag in condition.get("red_flags", []) if flag in symptoms]
+        met = condition["_red_flag_set"] & symptoms_set
+        met_red_flags = [flag for flag in condition.get("red_flags", []) if flag in met]
         if met_red_flags:
             reasons.append(f"⚠️ Red flags present: {', '.join(met_red_flags)}")
         
@@ -767,14 +801,14 @@ class CrossSymptomAnalyzer:
             summary_parts.append(f"Patient with fever for {duration} days, max temperature {temp}°F")
         
         # Associated symptoms summary
-        all_symptoms = []
+        all_symptoms: Set[str] = set()
         for complaint, data in interview_data.items():
             for key, value in data.items():
                 if "symptoms" in key and isinstance(value, list) and value != ["none"]:
-                    all_symptoms.extend(value)
+                    all_symptoms.update(value)
         
         if all_symptoms:
-            summary_parts.append(f"Associated symptoms: {', '.join(set(all_symptoms))}")
+            summary_parts.append(f"Associated symptoms: {', '.join(sorted(all_symptoms))}")
         
         # Top diagnoses
         if diagnoses:
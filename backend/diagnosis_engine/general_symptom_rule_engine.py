@@ -1,8 +1,9 @@
 from typing import Dict, List, Tuple, Any, Optional
-import json
 import os
 from pathlib import Path
 
+from diagnosis_engine._fast import json_loads
+
 class GeneralSymptomRuleEngine:
     """
     Enhanced symptom rule engine that processes general symptoms against clinical rules
@@ -21,8 +22,8 @@ class GeneralSymptomRuleEngine:
         
         # Load emergency rules
         try:
-            with open(rules_dir / "emergency_rules.json", 'r') as f:
-                emergency_data = json.load(f)
+            with open(rules_dir / "emergency_rules.json", 'rb') as f:
+                emergency_data = json_loads(f.read())
                 self.emergency_rules = emergency_data.get('rules', [])
                 print(f"✅ Loaded {len(self.emergency_rules)} emergency rules")
         except Exception as e:
@@ -30,8 +31,8 @@ class GeneralSymptomRuleEngine:
         
         # Load toxicology rules
         try:
-            with open(rules_dir / "toxicology_rules.json", 'r') as f:
-                toxicology_data = json.load(f)
+            with open(rules_dir / "toxicology_rules.json", 'rb') as f:
+                toxicology_data = json_loads(f.read())
                 self.toxicology_rules = toxicology_data.get('rules', [])
                 print(f"✅ Loaded {len(self.toxicology_rules)} toxicology rules")
         except Exception as e:
@@ -39,8 +40,8 @@ class GeneralSymptomRuleEngine:
         
         # Load general clinical rules
         try:
-            with open(rules_dir / "general_clinical_rules.json", 'r') as f:
-                general_data = json.load(f)
+            with open(rules_dir / "general_clinical_rules.json", 'rb') as f:
+                general_data = json_loads(f.read())
                 self.general_rules = general_data.get('rules', [])
                 print(f"✅ Loaded {len(self.general_rules)} general clinical rules")
         except Exception as e:
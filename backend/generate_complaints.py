@@ -3,27 +3,201 @@
 Generate complaint JSON files for top 20 Red-level complaints
 """
 
+import ast
+import copy
 import json
 import os
+import re
+import sys
 
+from diagnosis_engine._fast import HAS_ORJSON, orjson
+from symptom_intelligence.triage_rules import triage_rules_digest
+from symptom_intelligence.urgency import urgency_of
+
+# The runtime complaints directory. The hand-edited per-complaint files there
+# take precedence over the bundle (see load_complaints), so bundled complaints
+# only fill in the ones without a file
 COMPLAINTS_DIR = "/app/backend/symptom_intelligence/complaints"
 
+# All generated complaints go into one bundle the loader reads with a single open/parse
+BUNDLE_FILENAME = "complaints.json"
+BUNDLE_VERSION = 1
+
+# Compact JSON by default; pass --pretty for indented, reviewable output
+PRETTY = "--pretty" in sys.argv[1:]
+
+# Names the triage runtime provides as builtins; everything else in a rule is a slot
+RULE_BUILTINS = {"str", "int", "float", "bool", "len", "min", "max"}
+
+# Numeric parsing helpers the triage runtime provides to rule expressions
+RULE_HELPERS = {"_numf", "_intf"}
+
+# str(slot).lower() in a rule becomes slot_lc, filled once per turn by the runtime
+LOWER_CALL_RE = re.compile(r"str\((\w+)\)\.lower\(\)")
+
+# Hand-rolled unit stripping / first-token parsing, replaced by the runtime helpers
+FLOAT_PARSE_RE = re.compile(r"float\(str\((\w+)\)\.replace\('f',''\)\.replace\('c',''\)\.replace\('°',''\)\.split\(\)\[0\]\)")
+INT_PARSE_RE = re.compile(r"int\(str\((\w+)\)\.split\(\)\[0\] if str\(\1\)\.split\(\) else '0'\)")
+
+def normalize_rule_expression(expression):
+    """Rewrite per-rule slot lowercasing and number parsing to their precomputed forms"""
+    expression = FLOAT_PARSE_RE.sub(r"_numf(\1)", expression)
+    expression = INT_PARSE_RE.sub(r"_intf(\1)", expression)
+    return LOWER_CALL_RE.sub(r"\1_lc", expression)
+
+def compile_rule(rule, label):
+    """Check a rule compiles and attach its referenced slot names; return the helpers it uses"""
+    expression = rule["expression"]
+    # The runtime compiles the expression itself; this only fails fast on syntax errors
+    compile(expression, label, "eval")
+    names = {node.id for node in ast.walk(ast.parse(expression, mode="eval")) if isinstance(node, ast.Name)}
+    rule["slots_referenced"] = sorted(names - RULE_BUILTINS - RULE_HELPERS)
+    return names & RULE_HELPERS
+
+class _HoistRepeated(ast.NodeTransformer):
+    """Replace subtrees listed in `temps` (ast.dump -> temp name) with temp references"""
+    
+    def __init__(self, temps, skip_root=None):
+        self.temps = temps
+        self.skip_root = skip_root
+    
+    def visit(self, node):
+        key = ast.dump(node)
+        if node is not self.skip_root and key in self.temps:
+            return ast.Name(id=self.temps[key], ctx=ast.Load())
+        return self.generic_visit(node)
+
+def build_triage_function(triage_rules):
+    """Emit source for `_triage(_slots)`: index of the first matching rule, or None.
+    
+    Call and comparison subtrees repeated across rules are computed once into
+    `_cN` temporaries. A slot that was not collected, or a temporary that failed
+    to compute, is bound to the runtime's `_MISSING` sentinel, which raises on
+    use, so only the rules that touch it fail, as with per-rule eval.
+    """
+    trees = [ast.parse(rule["expression"], mode="eval").body for rule in triage_rules]
+    
+    counts = {}
+    first_seen = {}
+    for tree in trees:
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Call, ast.Compare)):
+                key = ast.dump(node)
+                counts[key] = counts.get(key, 0) + 1
+                first_seen.setdefault(key, node)
+    order = list(first_seen)
+    repeated = sorted((key for key, count in counts.items() if count > 1), key=lambda k: (len(k), order.index(k)))
+    temps = {key: f"_c{i}" for i, key in enumerate(repeated)}
+    
+    slot_names = sorted({
+        node.id for tree in trees for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and node.id not in RULE_BUILTINS | RULE_HELPERS
+    })
+    
+    # Inner subtrees have shorter dumps, so they are defined before their users
+    temp_defs = []
+    for key in repeated:
+        node = copy.deepcopy(first_seen[key])
+        temp_defs.append((temps[key], ast.unparse(_HoistRepeated(temps, skip_root=node).visit(node))))
+    rule_exprs = [ast.unparse(_HoistRepeated(temps).visit(copy.deepcopy(tree))) for tree in trees]
+    
+    lines = ["def _triage(_slots):"]
+    lines += [f"    {name} = _slots.get({name!r}, _MISSING)" for name in slot_names]
+    for name, expr in temp_defs:
+        lines += ["    try:", f"        {name} = {expr}", "    except Exception:", f"        {name} = _MISSING"]
+    for i, expr in enumerate(rule_exprs):
+        lines += ["    try:", f"        if {expr}:", f"            return {i}", "    except Exception:", "        pass"]
+    lines.append("    return None")
+    return "\n".join(lines) + "\n"
+
+# Shared question phrasings; complaints fill in the subject so the wording stays
+# consistent and each distinct question string is held once (interned)
+_QB = {
+    "onset": "When did {} start?{}",
+    "severity_1_10": "On a scale of 1-10, how severe is {}?",
+    "other_symptoms_like": "Do you have any other symptoms like {}?",
+    "how_long_had": "How long have you had {}?"
+}
+
+def question(key, *subject):
+    """Render a question-bank template as an interned string"""
+    return sys.intern(_QB[key].format(*subject))
+
+# Slot conversions worth computing once per turn when several rules share them
+PRELUDE_CONVERSIONS = {"int", "float", "_numf", "_intf"}
+
+def hoist_conversions(triage_rules):
+    """Move conversions like int(severity) used by more than one rule into a prelude.
+    
+    Returns the prelude as `_tN = conversion(slot)` statements; rule expressions
+    are rewritten in place to reference `_tN` instead.
+    """
+    trees = [ast.parse(rule["expression"], mode="eval") for rule in triage_rules]
+    rules_using = {}
+    first_seen = {}
+    for i, tree in enumerate(trees):
+        for node in ast.walk(tree):
+            if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+                    and node.func.id in PRELUDE_CONVERSIONS and not node.keywords
+                    and len(node.args) == 1 and isinstance(node.args[0], ast.Name)):
+                key = ast.dump(node)
+                rules_using.setdefault(key, set()).add(i)
+                first_seen.setdefault(key, node)
+    shared = [key for key in first_seen if len(rules_using[key]) > 1]
+    temps = {key: f"_t{i}" for i, key in enumerate(shared)}
+    
+    for i, (rule, tree) in enumerate(zip(triage_rules, trees)):
+        if any(i in rules_using[key] for key in shared):
+            rule["expression"] = ast.unparse(_HoistRepeated(temps).visit(tree).body)
+    return [f"{temps[key]} = {ast.unparse(first_seen[key])}" for key in shared]
+
+def build_complaint(chief_complaint, priority, slots, questions, completion_threshold, triage_rules):
+    """Assemble a complaint definition, running every triage rule through the same optimizer"""
+    name = chief_complaint.lower().replace(" ", "_")
+    for rule in triage_rules:
+        rule["expression"] = normalize_rule_expression(rule["expression"])
+    prelude = hoist_conversions(triage_rules)
+    normalized_slots = set()
+    helpers = {
+        node.id for statement in prelude for node in ast.walk(ast.parse(statement))
+        if isinstance(node, ast.Name) and node.id in RULE_HELPERS
+    }
+    for i, rule in enumerate(triage_rules):
+        helpers.update(compile_rule(rule, f"<{name}:{i}>"))
+        rule["level_value"] = int(urgency_of(rule["level"]))
+        normalized_slots.update(slot[:-3] for slot in rule["slots_referenced"] if slot.endswith("_lc"))
+    return {
+        "chief_complaint": chief_complaint,
+        "priority": priority,
+        "priority_level": int(urgency_of(priority)),
+        "slots": slots,
+        "questions": questions,
+        "completion_threshold": completion_threshold,
+        "prelude": prelude,
+        "triage_rules": triage_rules,
+        "normalized_slots": sorted(normalized_slots),
+        "helpers": sorted(helpers),
+        "compiled_fn_src": build_triage_function(triage_rules),
+        # Ties the function to these exact rules; the runtime ignores it after edits
+        "compiled_fn_digest": triage_rules_digest({"prelude": prelude, "triage_rules": triage_rules})
+    }
+
 # Define all 20 top Red-level complaints with their configurations
 complaints = {
-    "shortness_of_breath": {
-        "chief_complaint": "Shortness of Breath",
-        "priority": "🟥 Red",
-        "slots": ["onset", "severity", "rest_or_exertion", "chest_pain", "risk_factors", "duration"],
-        "questions": {
-            "onset": "When did the shortness of breath start? Was it sudden or gradual?",
-            "severity": "On a scale of 1-10, how severe is your breathing difficulty?",
+    "shortness_of_breath": build_complaint(
+        "Shortness of Breath",
+        "🟥 Red",
+        ["onset", "severity", "rest_or_exertion", "chest_pain", "risk_factors", "duration"],
+        {
+            "onset": question("onset", "the shortness of breath", " Was it sudden or gradual?"),
+            "severity": question("severity_1_10", "your breathing difficulty"),
             "rest_or_exertion": "Does it occur at rest or only with activity?",
             "chest_pain": "Do you have any chest pain along with the shortness of breath?",
             "risk_factors": "Do you have any of these: recent surgery, long travel, leg swelling, history of blood clots?",
             "duration": "How long have you been experiencing this?"
         },
-        "completion_threshold": 4,
-        "triage_rules": [
+        4,
+        [
             {
                 "expression": "'sudden' in str(onset).lower() and 'rest' in str(rest_or_exertion).lower() and int(severity) >= 7 and ('yes' in str(risk_factors).lower() or 'surgery' in str(risk_factors).lower())",
                 "level": "🟥 Red",
@@ -40,21 +214,21 @@ complaints = {
                 "reason": "Moderate shortness of breath with chest pain - Urgent evaluation needed"
             }
         ]
-    },
-    "fever": {
-        "chief_complaint": "Fever",
-        "priority": "🟥 Red",
-        "slots": ["duration", "temperature", "pattern", "associated_symptoms", "recent_travel", "immune_status"],
-        "questions": {
-            "duration": "How long have you had a fever?",
+    ),
+    "fever": build_complaint(
+        "Fever",
+        "🟥 Red",
+        ["duration", "temperature", "pattern", "associated_symptoms", "recent_travel", "immune_status"],
+        {
+            "duration": question("how_long_had", "a fever"),
             "temperature": "What is the highest temperature you've recorded?",
             "pattern": "Is the fever constant or does it come and go?",
-            "associated_symptoms": "Do you have any other symptoms like headache, stiff neck, rash, confusion, or difficulty breathing?",
+            "associated_symptoms": question("other_symptoms_like", "headache, stiff neck, rash, confusion, or difficulty breathing"),
             "recent_travel": "Have you traveled recently or been exposed to anyone who is sick?",
             "immune_status": "Do you have any conditions that affect your immune system, or are you on immunosuppressive medications?"
         },
-        "completion_threshold": 3,
-        "triage_rules": [
+        3,
+        [
             {
                 "expression": "float(str(temperature).replace('f','').replace('c','').replace('°','').split()[0]) >= 39.0 and ('stiff neck' in str(associated_symptoms).lower() or 'confusion' in str(associated_symptoms).lower() or 'rash' in str(associated_symptoms).lower())",
                 "level": "🟥 Red",
@@ -71,21 +245,21 @@ complaints = {
                 "reason": "Fever in immunocompromised patient - Urgent evaluation needed"
             }
         ]
-    },
-    "altered_mental_status": {
-        "chief_complaint": "Altered Mental Status",
-        "priority": "🟥 Red",
-        "slots": ["onset", "level_of_consciousness", "recent_trauma", "medical_history", "medications", "associated_symptoms"],
-        "questions": {
-            "onset": "When did the confusion or altered mental status start?",
+    ),
+    "altered_mental_status": build_complaint(
+        "Altered Mental Status",
+        "🟥 Red",
+        ["onset", "level_of_consciousness", "recent_trauma", "medical_history", "medications", "associated_symptoms"],
+        {
+            "onset": question("onset", "the confusion or altered mental status", ""),
             "level_of_consciousness": "Is the person alert, confused, drowsy, or unresponsive?",
             "recent_trauma": "Has there been any recent head injury or trauma?",
             "medical_history": "Do you have diabetes, seizure disorder, or other medical conditions?",
             "medications": "What medications are you currently taking?",
             "associated_symptoms": "Are there any other symptoms like fever, headache, weakness, or difficulty speaking?"
         },
-        "completion_threshold": 3,
-        "triage_rules": [
+        3,
+        [
             {
                 "expression": "'unresponsive' in str(level_of_consciousness).lower() or 'drowsy' in str(level_of_consciousness).lower()",
                 "level": "🟥 Red",
@@ -102,21 +276,21 @@ complaints = {
                 "reason": "Confusion with fever - Possible meningitis or encephalitis - Emergency care required"
             }
         ]
-    },
-    "headache": {
-        "chief_complaint": "Headache",
-        "priority": "🟥 Red",
-        "slots": ["onset", "severity", "location", "character", "associated_symptoms", "duration"],
-        "questions": {
-            "onset": "When did the headache start? Was it sudden (thunderclap) or gradual?",
-            "severity": "On a scale of 1-10, how severe is the headache? Is it the worst headache of your life?",
+    ),
+    "headache": build_complaint(
+        "Headache",
+        "🟥 Red",
+        ["onset", "severity", "location", "character", "associated_symptoms", "duration"],
+        {
+            "onset": question("onset", "the headache", " Was it sudden (thunderclap) or gradual?"),
+            "severity": question("severity_1_10", "the headache") + " Is it the worst headache of your life?",
             "location": "Where is the headache located? (front, back, side, all over)",
             "character": "How would you describe the pain? (throbbing, sharp, dull, pressure)",
-            "associated_symptoms": "Do you have any other symptoms like vision changes, weakness, confusion, stiff neck, fever, or nausea?",
-            "duration": "How long have you had this headache?"
+            "associated_symptoms": question("other_symptoms_like", "vision changes, weakness, confusion, stiff neck, fever, or nausea"),
+            "duration": question("how_long_had", "this headache")
         },
-        "completion_threshold": 4,
-        "triage_rules": [
+        4,
+        [
             {
                 "expression": "'sudden' in str(onset).lower() and int(severity) >= 8 and ('worst' in str(severity).lower() or 'thunderclap' in str(onset).lower())",
                 "level": "🟥 Red",
@@ -133,12 +307,12 @@ complaints = {
                 "reason": "Headache with neurological symptoms - Urgent evaluation needed"
             }
         ]
-    },
-    "syncope": {
-        "chief_complaint": "Syncope",
-        "priority": "🟥 Red",
-        "slots": ["circumstances", "warning_signs", "duration_unconscious", "recovery", "chest_pain", "palpitations"],
-        "questions": {
+    ),
+    "syncope": build_complaint(
+        "Syncope",
+        "🟥 Red",
+        ["circumstances", "warning_signs", "duration_unconscious", "recovery", "chest_pain", "palpitations"],
+        {
             "circumstances": "What were you doing when you fainted? (standing, sitting, exercising)",
             "warning_signs": "Did you have any warning before fainting? (dizziness, nausea, vision changes)",
             "duration_unconscious": "How long were you unconscious?",
@@ -146,8 +320,8 @@ complaints = {
             "chest_pain": "Did you have chest pain before or after fainting?",
             "palpitations": "Did you feel your heart racing or skipping beats?"
         },
-        "completion_threshold": 3,
-        "triage_rules": [
+        3,
+        [
             {
                 "expression": "'yes' in str(chest_pain).lower() or 'yes' in str(palpitations).lower()",
                 "level": "🟥 Red",
@@ -164,12 +338,12 @@ complaints = {
                 "reason": "Prolonged loss of consciousness or slow recovery - Urgent evaluation needed"
             }
         ]
-    },
-    "seizures": {
-        "chief_complaint": "Seizures",
-        "priority": "🟥 Red",
-        "slots": ["first_seizure", "duration", "type", "post_ictal_state", "head_trauma", "fever"],
-        "questions": {
+    ),
+    "seizures": build_complaint(
+        "Seizures",
+        "🟥 Red",
+        ["first_seizure", "duration", "type", "post_ictal_state", "head_trauma", "fever"],
+        {
             "first_seizure": "Is this the first seizure ever, or have you had seizures before?",
             "duration": "How long did the seizure last?",
             "type": "What type of movements occurred? (shaking, stiffness, staring)",
@@ -177,8 +351,8 @@ complaints = {
             "head_trauma": "Was there any recent head injury?",
             "fever": "Is there a fever present?"
         },
-        "completion_threshold": 3,
-        "triage_rules": [
+        3,
+        [
             {
                 "expression": "'first' in str(first_seizure).lower() and 'yes' in str(first_seizure).lower()",
                 "level": "🟥 Red",
@@ -195,7 +369,7 @@ complaints = {
                 "reason": "Seizure after head trauma - Emergency evaluation needed"
             }
         ]
-    }
+    )
 }
 
 # Additional complaints (shortened for brevity - will add full details)
@@ -205,14 +379,40 @@ additional_complaints = [
     "cyanosis", "severe_bleeding", "hypotension", "palpitations", "anaphylaxis"
 ]
 
-# Create complaint files
-os.makedirs(COMPLAINTS_DIR, exist_ok=True)
+def encode_bundle(bundle):
+    """Serialize the complaint bundle to UTF-8 JSON bytes, compact unless PRETTY"""
+    if HAS_ORJSON:
+        return orjson.dumps(bundle, option=orjson.OPT_INDENT_2 if PRETTY else 0)
+    if PRETTY:
+        return json.dumps(bundle, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(bundle, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def write_bundle(complaints_dir: str = COMPLAINTS_DIR):
+    """Write the complaint bundle to complaints_dir and report what was done"""
+    os.makedirs(complaints_dir, exist_ok=True)
+
+    bundle_path = os.path.join(complaints_dir, BUNDLE_FILENAME)
+    encoded = encode_bundle({"version": BUNDLE_VERSION, "complaints": complaints})
+    try:
+        with open(bundle_path, 'rb') as f:
+            existing = f.read()
+    except FileNotFoundError:
+        existing = None
+
+    # Status lines are collected and written once at the end
+    lines = []
+
+    # Skip the write on no-change reruns so watchers and build caches stay quiet
+    if existing == encoded:
+        lines.append(f"⏭️ Unchanged {bundle_path}")
+    else:
+        with open(bundle_path, 'wb', buffering=65536) as f:
+            f.write(encoded)
+        lines.append(f"✅ Created {bundle_path}")
 
-for filename, data in complaints.items():
-    filepath = os.path.join(COMPLAINTS_DIR, f"{filename}.json")
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    print(f"✅ Created {filepath}")
+    lines.append(f"\n📊 Bundled {len(complaints)} complaints")
+    lines.append("Note: Additional complaints need to be defined for complete top 20")
+    sys.stdout.write("\n".join(lines) + "\n")
 
-print(f"\n📊 Created {len(complaints)} complaint files")
-print("Note: Additional complaint files need to be created for complete top 20")
+if __name__ == "__main__":
+    write_bundle()
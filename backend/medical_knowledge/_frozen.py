@@ -0,0 +1,36 @@
+"""
+Read-only views of the static clinical knowledge bases.
+
+Knowledge bases are stored as JSON next to this module and parsed with the
+engine's JSON loader (orjson when installed), which builds the object tree
+faster than executing the equivalent Python literal.
+
+Knowledge dicts are shared by every request (and handed out inside
+assessments), so they are frozen at import: dicts become MappingProxyType
+and lists become tuples. Callers that need to modify a section copy it.
+Strings are interned so repeated terms share one object and equal lookups
+hit the identity fast path.
+"""
+
+import os
+import sys
+from types import MappingProxyType
+
+from diagnosis_engine._fast import json_loads
+
+KNOWLEDGE_DIR = os.path.dirname(__file__)
+
+def freeze(value):
+    """Recursively convert dicts to MappingProxyType and lists to tuples, interning strings"""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return MappingProxyType({freeze(key): freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def load_frozen(filename: str):
+    """Load a knowledge-base JSON file from this package, frozen"""
+    with open(os.path.join(KNOWLEDGE_DIR, filename), "rb") as f:
+        return freeze(json_loads(f.read()))
@@ -0,0 +1,93 @@
+"""
+Multi-term substring matching for the clinical knowledge modules.
+
+Each knowledge module looks up a fixed vocabulary (keywords, clues, phrases)
+in free-text descriptions. A TermMatcher finds every vocabulary term in one
+pass over the text and reports the OR of the matched terms' masks, so callers
+assign whatever bits they need (one per term, per category, per rule) and
+test them with &.
+
+With pyahocorasick installed the scan is an Aho-Corasick automaton; without
+it, an overlapping regex alternation gives the same masks. A term matches
+wherever it occurs as a substring, exactly like `term in text`.
+"""
+
+import re
+from bisect import bisect_left
+from typing import Iterable, List, Tuple
+
+from diagnosis_engine._fast import HAS_AHOCORASICK, ahocorasick
+
+class TermMatcher:
+    """Finds every known term in a text in one scan, reported as the OR of their masks"""
+
+    def __init__(self, term_masks: Iterable[Tuple[str, int]]):
+        # Terms listed more than once get the OR of their masks
+        self.masks = {}
+        for term, mask in term_masks:
+            self.masks[term] = self.masks.get(term, 0) | mask
+
+        # A match on "chest pain" is also a match on any term it contains; the
+        # regex fallback only reports the longest term at each position
+        self.folded = {}
+        for term in self.masks:
+            self.folded[term] = 0
+            for other, mask in self.masks.items():
+                if other in term:
+                    self.folded[term] |= mask
+
+        self.automaton = None
+        if HAS_AHOCORASICK and self.masks:
+            self.automaton = ahocorasick.Automaton()
+            for term, mask in self.masks.items():
+                self.automaton.add_word(term, mask)
+            self.automaton.make_automaton()
+        # Lookahead so matches may overlap; longest alternatives first
+        self.pattern = re.compile(
+            "(?=(" + "|".join(map(re.escape, sorted(self.masks, key=len, reverse=True))) + "))"
+        ) if self.masks else None
+
+    @classmethod
+    def from_terms(cls, terms: Iterable[str]) -> "TermMatcher":
+        """Matcher giving each distinct term its own bit, in first-seen order"""
+        bits = {}
+        for term in terms:
+            bits.setdefault(term, 1 << len(bits))
+        return cls(bits.items())
+
+    def mask(self, terms: Iterable[str]) -> int:
+        """Masks of the given terms"""
+        mask = 0
+        for term in terms:
+            mask |= self.masks[term]
+        return mask
+
+    def scan(self, text: str) -> int:
+        """Masks of every term occurring in text"""
+        mask = 0
+        if self.automaton is not None:
+            for _, term_mask in self.automaton.iter(text):
+                mask |= term_mask
+        elif self.pattern is not None:
+            for term in self.pattern.findall(text):
+                mask |= self.folded[term]
+        return mask
+
+    def scan_many(self, texts: List[str]) -> List[int]:
+        """Masks of the terms occurring in each text, from a single scan over all of them"""
+        masks = [0] * len(texts)
+        # Terms never contain NUL, so no match spans two texts; a match's
+        # offset maps back to its text through the separator positions
+        separators = []
+        end = -1
+        for text in texts:
+            end += len(text) + 1
+            separators.append(end)
+        joined = "\x00".join(texts)
+        if self.automaton is not None:
+            for end, term_mask in self.automaton.iter(joined):
+                masks[bisect_left(separators, end)] |= term_mask
+        elif self.pattern is not None:
+            for match in self.pattern.finditer(joined):
+                masks[bisect_left(separators, match.start())] |= self.folded[match.group(1)]
+        return masks
@@ -4,6 +4,15 @@ Based on emergency medicine protocols for systematic AMS evaluation
 Uses AEIOU TIPS mnemonic for comprehensive differential diagnosis
 """
 
+import sys
+from dataclasses import dataclass
+from enum import IntEnum
+
+import numpy as np
+
+from diagnosis_engine._fast import HAS_NUMBA, njit
+from medical_knowledge._matcher import TermMatcher
+
 ALTERED_MENTAL_STATUS_KNOWLEDGE = {
     "immediate_actions": [
         "Assess ABCs and initiate resuscitation if needed",
@@ -304,7 +313,115 @@ ALTERED_MENTAL_STATUS_KNOWLEDGE = {
     }
 }
 
-def analyze_altered_mental_status(symptoms: dict, patient_factors: dict) -> dict:
+# Module-level aliases for the knowledge sections every assessment returns
+_IMMEDIATE = ALTERED_MENTAL_STATUS_KNOWLEDGE["immediate_actions"]
+_WORKUP = ALTERED_MENTAL_STATUS_KNOWLEDGE["essential_workup"]
+_RED_FLAGS = ALTERED_MENTAL_STATUS_KNOWLEDGE["red_flags"]
+
+class Cat(IntEnum):
+    """Index of each AEIOU TIPS category in the score arrays"""
+    ALCOHOL_RELATED = 0
+    ELECTROLYTE_ENDOCRINE = 1
+    GLUCOSE_DISORDER = 2
+    OXYGEN_OVERDOSE = 3
+    UREMIA = 4
+    TRAUMA_TEMP_TOXIN = 5
+    INFECTION_CNS = 6
+    MEDICATION_RELATED = 7
+    NEURO_VASCULAR = 8
+
+# AEIOU TIPS categories as (keywords, category, score), in Cat order; keywords
+# match as substrings of the symptom description. Single source for matcher and scorer.
+_CATEGORIES = (
+    (frozenset({"alcohol", "drunk", "drinking", "withdrawal", "tremor", "stopped drinking"}), Cat.ALCOHOL_RELATED, 0.7),
+    (frozenset({"dehydration", "thirst", "polyuria", "cold intolerance", "heat intolerance"}), Cat.ELECTROLYTE_ENDOCRINE, 0.6),
+    (frozenset({"diabetic", "sugar", "glucose", "thirsty", "urination"}), Cat.GLUCOSE_DISORDER, 0.8),
+    (frozenset({"shortness of breath", "difficulty breathing", "blue", "pills", "overdose"}), Cat.OXYGEN_OVERDOSE, 0.7),
+    (frozenset({"kidney", "dialysis", "uremia"}), Cat.UREMIA, 0.8),
+    (frozenset({"fall", "hit head", "accident", "hot", "cold", "poison"}), Cat.TRAUMA_TEMP_TOXIN, 0.7),
+    (frozenset({"fever", "headache", "neck stiff", "infection", "sick"}), Cat.INFECTION_CNS, 0.8),
+    (frozenset({"medication", "pills", "new medicine", "stopped medicine"}), Cat.MEDICATION_RELATED, 0.6),
+    (frozenset({"seizure", "convulsion", "weakness", "speech", "face droop"}), Cat.NEURO_VASCULAR, 0.8)
+)
+
+# Bit i of a category mask is set when category Cat(i) matched. Weights stay
+# float64 so likelihoods (int(score * 100)) round exactly as before.
+_CATEGORY_WEIGHTS = np.array([score for _, _, score in _CATEGORIES])
+_GLUCOSE_INDEX = int(Cat.GLUCOSE_DISORDER)
+_MEDICATION_INDEX = int(Cat.MEDICATION_RELATED)
+
+# Clinical differentials reported for the scored AEIOU TIPS categories
+_DIFFERENTIAL_MAPPING = {
+    Cat.ALCOHOL_RELATED: {
+        "condition": "Alcohol Withdrawal/Intoxication",
+        "description": "Alcohol-related altered mental status requiring immediate evaluation",
+        "rationale": "History and symptoms consistent with alcohol use disorder"
+    },
+    Cat.GLUCOSE_DISORDER: {
+        "condition": "Hypoglycemia/Hyperglycemia", 
+        "description": "Blood sugar abnormality causing altered mental status",
+        "rationale": "Diabetes history or symptoms suggesting glucose dysfunction"
+    },
+    Cat.INFECTION_CNS: {
+        "condition": "CNS Infection/Sepsis",
+        "description": "Bacterial or viral infection affecting brain function", 
+        "rationale": "Fever, infectious symptoms, or sepsis risk factors"
+    },
+    Cat.MEDICATION_RELATED: {
+        "condition": "Medication Toxicity/Polypharmacy",
+        "description": "Drug-induced altered mental status",
+        "rationale": "Multiple medications or recent changes, especially in elderly"
+    }
+}
+
+# Most common causes, ranked, used when no category scored. Of these only
+# glucose disorder has a reportable differential.
+_FALLBACK_CONDITIONS = (
+    ("infection_sepsis", 0.6),
+    ("medication_polypharmacy", 0.5),
+    (Cat.GLUCOSE_DISORDER, 0.5),
+    ("electrolyte_imbalance", 0.4)
+)
+
+# Red flags with their lowercased words, matched as substrings of the description
+_RED_FLAG_TOKENS = tuple(
+    (red_flag, tuple(red_flag.lower().split()))
+    for red_flag in _RED_FLAGS
+)
+
+def _keyword_masks():
+    """(keyword, category bit) pairs for every AEIOU TIPS keyword"""
+    for keywords, category, _ in _CATEGORIES:
+        for keyword in keywords:
+            yield sys.intern(keyword.lower()), 1 << category
+
+_KEYWORD_MATCHER = TermMatcher(_keyword_masks())
+
+@njit(cache=True)
+def _score_categories(mask, elderly, diabetes, weights):
+    """Per-category scores for a match mask; diabetes and age force their categories"""
+    out = np.zeros(weights.shape[0])
+    for i in range(weights.shape[0]):
+        if (mask >> i) & 1:
+            out[i] = weights[i]
+    if diabetes:
+        out[_GLUCOSE_INDEX] = weights[_GLUCOSE_INDEX]
+    if elderly:
+        out[_MEDICATION_INDEX] = weights[_MEDICATION_INDEX]
+    return out
+
+if HAS_NUMBA:
+    # Compile (or load from cache) at import rather than on the first request
+    _score_categories(0, False, False, _CATEGORY_WEIGHTS)
+
+@dataclass(slots=True, frozen=True)
+class AMSInput:
+    """Pre-normalized inputs for analyze_altered_mental_status; text fields are already lowercased"""
+    description_lc: str
+    age: int
+    medical_history_lc: str
+
+def analyze_altered_mental_status(inp: AMSInput) -> dict:
     """
     Analyze altered mental status using AEIOU TIPS systematic approach
     """
@@ -312,108 +429,35 @@ def analyze_altered_mental_status(symptoms: dict, patient_factors: dict) -> dict
     assessment = {
         "differentials": [],
         "urgency": "EMERGENCY",  # AMS is always concerning
-        "immediate_actions": ALTERED_MENTAL_STATUS_KNOWLEDGE["immediate_actions"],
-        "essential_workup": ALTERED_MENTAL_STATUS_KNOWLEDGE["essential_workup"],
+        "immediate_actions": _IMMEDIATE,
+        "essential_workup": _WORKUP,
         "red_flags_present": []
     }
     
     # Check for red flags first
-    symptom_text = symptoms.get("description", "").lower()
+    symptom_text = inp.description_lc
     
-    for red_flag in ALTERED_MENTAL_STATUS_KNOWLEDGE["red_flags"]:
-        flag_keywords = red_flag.lower().split()
+    for red_flag, flag_keywords in _RED_FLAG_TOKENS:
         if any(keyword in symptom_text for keyword in flag_keywords):
             assessment["red_flags_present"].append(red_flag)
     
     # Analyze using AEIOU TIPS categories
-    condition_scores = {}
-    
-    # Alcohol/Drug related
-    alcohol_keywords = ["alcohol", "drunk", "drinking", "withdrawal", "tremor", "stopped drinking"]
-    if any(keyword in symptom_text for keyword in alcohol_keywords):
-        condition_scores["alcohol_related"] = 0.7
-        
-    # Electrolyte/Endocrine
-    electrolyte_keywords = ["dehydration", "thirst", "polyuria", "cold intolerance", "heat intolerance"]
-    if any(keyword in symptom_text for keyword in electrolyte_keywords):
-        condition_scores["electrolyte_endocrine"] = 0.6
-        
-    # Insulin/Glucose
-    glucose_keywords = ["diabetic", "sugar", "glucose", "thirsty", "urination"]
-    diabetes_history = "diabetes" in str(patient_factors.get("medical_history", "")).lower()
-    if any(keyword in symptom_text for keyword in glucose_keywords) or diabetes_history:
-        condition_scores["glucose_disorder"] = 0.8
-        
-    # Oxygen/Overdose
-    respiratory_keywords = ["shortness of breath", "difficulty breathing", "blue", "pills", "overdose"]
-    if any(keyword in symptom_text for keyword in respiratory_keywords):
-        condition_scores["oxygen_overdose"] = 0.7
-        
-    # Uremia
-    kidney_keywords = ["kidney", "dialysis", "uremia"]
-    if any(keyword in symptom_text for keyword in kidney_keywords):
-        condition_scores["uremia"] = 0.8
-        
-    # Trauma/Temperature/Toxins
-    trauma_keywords = ["fall", "hit head", "accident", "hot", "cold", "poison"]
-    if any(keyword in symptom_text for keyword in trauma_keywords):
-        condition_scores["trauma_temp_toxin"] = 0.7
-        
-    # Infection/Intracranial
-    infection_keywords = ["fever", "headache", "neck stiff", "infection", "sick"]
-    if any(keyword in symptom_text for keyword in infection_keywords):
-        condition_scores["infection_cns"] = 0.8
-        
-    # Pharmacology
-    med_keywords = ["medication", "pills", "new medicine", "stopped medicine"]
-    elderly = patient_factors.get("age", 0) > 65
-    if any(keyword in symptom_text for keyword in med_keywords) or elderly:
-        condition_scores["medication_related"] = 0.6
-        
-    # Seizure/Stroke/Shock
-    neuro_keywords = ["seizure", "convulsion", "weakness", "speech", "face droop"]
-    if any(keyword in symptom_text for keyword in neuro_keywords):
-        condition_scores["neuro_vascular"] = 0.8
+    diabetes_history = "diabetes" in inp.medical_history_lc
+    elderly = inp.age > 65
+    scores = _score_categories(_KEYWORD_MATCHER.scan(symptom_text), elderly, diabetes_history, _CATEGORY_WEIGHTS)
     
-    # Generate top differentials
-    if not condition_scores:
+    # Generate top differentials; stable sort keeps Cat order among equal scores
+    top_conditions = [
+        (Cat(i), float(scores[i]))
+        for i in np.argsort(-scores, kind="stable")[:4] if scores[i] > 0
+    ]
+    if not top_conditions:
         # If no specific category identified, consider most common causes
-        condition_scores = {
-            "infection_sepsis": 0.6,
-            "medication_polypharmacy": 0.5,
-            "glucose_disorder": 0.5,
-            "electrolyte_imbalance": 0.4
-        }
-    
-    # Convert to clinical differentials
-    differential_mapping = {
-        "alcohol_related": {
-            "condition": "Alcohol Withdrawal/Intoxication",
-            "description": "Alcohol-related altered mental status requiring immediate evaluation",
-            "rationale": "History and symptoms consistent with alcohol use disorder"
-        },
-        "glucose_disorder": {
-            "condition": "Hypoglycemia/Hyperglycemia", 
-            "description": "Blood sugar abnormality causing altered mental status",
-            "rationale": "Diabetes history or symptoms suggesting glucose dysfunction"
-        },
-        "infection_cns": {
-            "condition": "CNS Infection/Sepsis",
-            "description": "Bacterial or viral infection affecting brain function", 
-            "rationale": "Fever, infectious symptoms, or sepsis risk factors"
-        },
-        "medication_related": {
-            "condition": "Medication Toxicity/Polypharmacy",
-            "description": "Drug-induced altered mental status",
-            "rationale": "Multiple medications or recent changes, especially in elderly"
-        }
-    }
-    
-    sorted_conditions = sorted(condition_scores.items(), key=lambda x: x[1], reverse=True)
+        top_conditions = _FALLBACK_CONDITIONS
     
-    for condition_key, likelihood in sorted_conditions[:4]:
-        if condition_key in differential_mapping:
-            diff = differential_mapping[condition_key]
+    for condition_key, likelihood in top_conditions:
+        if condition_key in _DIFFERENTIAL_MAPPING:
+            diff = _DIFFERENTIAL_MAPPING[condition_key]
             assessment["differentials"].append({
                 "condition": diff["condition"],
                 "likelihood": int(likelihood * 100),
@@ -3,201 +3,266 @@ Chest Pain Clinical Knowledge Base
 Based on emergency medicine protocols for systematic chest pain evaluation
 """
 
-CHEST_PAIN_KNOWLEDGE = {
-    "initial_approach": {
-        "mandatory_actions": [
-            "Place patient on cardiac monitor",
-            "Establish IV access",
-            "Obtain vital signs including oxygen saturation"
+import sys
+from enum import IntEnum
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
+
+from diagnosis_engine._fast import HAS_NUMBA, njit
+from medical_knowledge._frozen import load_frozen
+from medical_knowledge._matcher import TermMatcher
+
+CHEST_PAIN_KNOWLEDGE = load_frozen("chest_pain_kb.json")
+
+# Score contributions, added one at a time in this order (risk factors,
+# typical symptoms, high-risk factors) so likelihoods round as they always have
+_BASE_SCORE = 0.3
+_RISK_FACTOR_SCORE = 0.2
+_TYPICAL_SYMPTOM_SCORE = 0.25
+_HIGH_RISK_SCORE = 0.15
+_MAX_SCORE = 0.95
+
+class Urgency(IntEnum):
+    """Urgency levels, ordered so the most urgent finding is the max; .name is the API string"""
+    ROUTINE = 0
+    URGENT = 1
+    EMERGENCY = 2
+
+class _Condition(NamedTuple):
+    """A knowledge-base condition destructured once at import"""
+    key: str
+    name: str
+    presentation: str
+    urgency: Urgency
+    rationale: str
+    risk_factors: tuple      # lowercased
+    high_risk: tuple         # lowercased
+    typical_symptoms: tuple
+
+def _destructure(key: str, condition) -> _Condition:
+    """Flatten a condition entry; missing likelihood modifiers become empty tuples"""
+    modifiers = condition.get("likelihood_modifiers", {})
+    return _Condition(
+        key=key,
+        name=condition["name"],
+        presentation=condition["typical_presentation"],
+        urgency=Urgency[condition["urgency"]],
+        rationale=f"Risk factors and symptom pattern consistent with {condition['name'].lower()}",
+        risk_factors=tuple(sys.intern(term.lower()) for term in condition["risk_factors"]),
+        high_risk=tuple(sys.intern(term.lower()) for term in modifiers.get("high_risk", ())),
+        typical_symptoms=tuple(modifiers.get("typical_symptoms", ()))
+    )
+
+# Conditions in knowledge-base order; score arrays are indexed the same way
+_CONDITIONS = tuple(_destructure(key, condition) for key, condition in CHEST_PAIN_KNOWLEDGE["conditions"].items())
+
+# Term masks are packed into np.uint64, so each vocabulary gets at most 64 bits
+_MAX_TERMS = 64
+
+def _term_bits(terms, kind: str) -> dict:
+    """One bit per term, in order; raises ValueError if the terms do not fit a uint64 mask"""
+    if len(terms) > _MAX_TERMS:
+        raise ValueError(f"{len(terms)} chest pain {kind} terms do not fit a {_MAX_TERMS}-bit mask")
+    return {term: 1 << i for i, term in enumerate(terms)}
+
+# Every term looked up in the symptom description (descriptor keywords and
+# typical symptoms), one bit each
+_SYMPTOM_TERMS = sorted(
+    {keyword for info in CHEST_PAIN_KNOWLEDGE["symptom_descriptors"].values() for keyword in info["keywords"]}
+    | {symptom for condition in _CONDITIONS for symptom in condition.typical_symptoms}
+)
+_SYMPTOM_BITS = _term_bits(_SYMPTOM_TERMS, "symptom")
+
+# Every lowercased condition risk term (risk factors and high-risk modifiers), one bit each
+_RISK_TERMS = sorted(
+    {term for condition in _CONDITIONS for term in condition.risk_factors + condition.high_risk}
+)
+_RISK_BITS = _term_bits(_RISK_TERMS, "risk")
+
+def _build_risk_substring_masks() -> dict:
+    """Map every substring of every risk term to the mask of terms containing it"""
+    masks = {}
+    for term, bit in _RISK_BITS.items():
+        for start in range(len(term) + 1):
+            for end in range(start, len(term) + 1):
+                masks[term[start:end]] = masks.get(term[start:end], 0) | bit
+    return masks
+
+# A patient risk factor matches a condition term when it is a substring of it,
+# so one lookup here replaces a substring scan over every term
+_RISK_SUBSTRING_MASKS = _build_risk_substring_masks()
+
+def _mask(terms, bits: dict) -> int:
+    """OR together the bits of the given terms"""
+    mask = 0
+    for term in terms:
+        mask |= bits[term]
+    return mask
+
+# Descriptors as (keyword mask, differentials, urgency) records
+_DESCRIPTORS = tuple(
+    (_mask(info["keywords"], _SYMPTOM_BITS), tuple(info["differentials"]), Urgency[info["urgency"]])
+    for info in CHEST_PAIN_KNOWLEDGE["symptom_descriptors"].values()
+)
+
+# Per-condition term masks, in _CONDITIONS order
+_COND_RISK_MASKS = np.array([_mask(c.risk_factors, _RISK_BITS) for c in _CONDITIONS], dtype=np.uint64)
+_COND_SYMPTOM_MASKS = np.array([_mask(c.typical_symptoms, _SYMPTOM_BITS) for c in _CONDITIONS], dtype=np.uint64)
+_COND_HIGH_RISK_MASKS = np.array([_mask(c.high_risk, _RISK_BITS) for c in _CONDITIONS], dtype=np.uint64)
+
+def _build_score_table() -> np.ndarray:
+    """Capped score for every (risk factor, typical symptom, high-risk) hit count"""
+    max_hits = [int(np.bitwise_count(masks).max()) for masks in (_COND_RISK_MASKS, _COND_SYMPTOM_MASKS, _COND_HIGH_RISK_MASKS)]
+    table = np.empty([n + 1 for n in max_hits])
+    for risk_hits in range(max_hits[0] + 1):
+        for symptom_hits in range(max_hits[1] + 1):
+            for high_risk_hits in range(max_hits[2] + 1):
+                score = _BASE_SCORE
+                for _ in range(risk_hits):
+                    score += _RISK_FACTOR_SCORE
+                for _ in range(symptom_hits):
+                    score += _TYPICAL_SYMPTOM_SCORE
+                for _ in range(high_risk_hits):
+                    score += _HIGH_RISK_SCORE
+                table[risk_hits, symptom_hits, high_risk_hits] = min(score, _MAX_SCORE)
+    return table
+
+_SCORE_TABLE = _build_score_table()
+
+@njit(cache=True)
+def _popcount(value):
+    """Set bits in a uint64"""
+    count = 0
+    while value:
+        value &= value - np.uint64(1)
+        count += 1
+    return count
+
+@njit(cache=True)
+def _score_conditions(risk_mask, symptom_mask, cond_risk_masks, cond_symptom_masks, cond_high_risk_masks, score_table):
+    """Per-condition scores from the patient's risk and symptom masks"""
+    scores = np.empty(cond_risk_masks.shape[0])
+    for i in range(cond_risk_masks.shape[0]):
+        scores[i] = score_table[
+            _popcount(cond_risk_masks[i] & risk_mask),
+            _popcount(cond_symptom_masks[i] & symptom_mask),
+            _popcount(cond_high_risk_masks[i] & risk_mask)
         ]
-    },
-    
-    "symptom_descriptors": {
-        "abrupt_severe_ripping": {
-            "differentials": ["aortic dissection", "esophageal rupture"],
-            "keywords": ["abrupt", "sudden", "severe", "ripping", "tearing", "back radiation"],
-            "urgency": "EMERGENCY"
-        },
-        "pleuritic_dyspnea": {
-            "differentials": ["pulmonary embolism", "spontaneous pneumothorax"],
-            "keywords": ["pleuritic", "sharp with breathing", "dyspnea", "shortness of breath"],
-            "urgency": "EMERGENCY"
-        },
-        "gradual_pressure": {
-            "differentials": ["myocardial infarction"],
-            "keywords": ["gradual", "pressure", "crushing", "squeezing", "substernal"],
-            "urgency": "EMERGENCY"
-        }
-    },
-    
-    "conditions": {
-        "stemi": {
-            "name": "ST Elevation Myocardial Infarction",
-            "risk_factors": ["diabetes", "hypertension", "smoking", "family history"],
-            "typical_presentation": "Substernal pain, gradual onset, pressure sensation",
-            "examination": "May be normal or signs of heart failure",
-            "essential_tests": ["EKG for ST elevations/LBBB", "CXR", "Troponin"],
-            "treatment": [
-                "Aspirin (clopidogrel if allergic)",
-                "Nitroglycerin (avoid if RV infarct)",
-                "Anticoagulation (heparin/LMWH)",
-                "Emergent cardiac catheterization or thrombolytics"
-            ],
-            "urgency": "EMERGENCY",
-            "likelihood_modifiers": {
-                "high_risk": ["diabetes", "smoking", "family_history", "hypertension"],
-                "typical_symptoms": ["substernal", "pressure", "gradual onset"],
-                "age_male_over_40": 1.5,
-                "age_female_over_50": 1.5
-            }
-        },
-        
-        "pulmonary_embolism": {
-            "name": "Pulmonary Embolism",
-            "risk_factors": ["cancer", "recent surgery", "long travel", "DVT history", "oral contraceptives"],
-            "typical_presentation": "Dyspnea, cough, pleuritic chest pain",
-            "examination": "Tachypnea, tachycardia, clear lungs, leg swelling",
-            "essential_tests": ["EKG (right heart strain)", "CXR", "D-dimer", "CT angiogram"],
-            "treatment": ["Anticoagulation with heparin/LMWH"],
-            "urgency": "EMERGENCY",
-            "likelihood_modifiers": {
-                "high_risk": ["cancer", "recent_surgery", "immobilization", "pregnancy"],
-                "typical_symptoms": ["dyspnea", "pleuritic", "cough"]
-            }
-        },
-        
-        "aortic_dissection": {
-            "name": "Aortic Dissection",
-            "risk_factors": ["marfan syndrome", "connective tissue disease", "family history", "aortic instrumentation"],
-            "typical_presentation": "Abrupt onset, severe, ripping/tearing pain, back radiation",
-            "examination": "Pulse deficit, neurologic deficits, new diastolic murmur",
-            "essential_tests": ["EKG", "CXR (widened mediastinum)", "CT angiogram"],
-            "treatment": [
-                "Beta-blocker for rate control (pulse <60)",
-                "IV morphine for pain",
-                "Nitroprusside if SBP >120",
-                "Emergent surgical consultation"
-            ],
-            "urgency": "EMERGENCY",
-            "likelihood_modifiers": {
-                "high_risk": ["marfan", "connective_tissue", "hypertension"],
-                "typical_symptoms": ["abrupt", "ripping", "tearing", "severe"]
-            }
-        },
-        
-        "pneumothorax": {
-            "name": "Spontaneous Pneumothorax",
-            "risk_factors": ["tall thin young males", "marfan syndrome", "COPD"],
-            "typical_presentation": "Sudden onset pleuritic pain with dyspnea",
-            "examination": "Decreased/absent breath sounds on affected side",
-            "essential_tests": ["CXR (pleural edge)"],
-            "treatment": [
-                "Small (<3cm): O2 + observation",
-                "Large: tube thoracostomy",
-                "Unstable: immediate decompression"
-            ],
-            "urgency": "URGENT",
-            "likelihood_modifiers": {
-                "high_risk": ["young_male", "tall_thin", "marfan"],
-                "typical_symptoms": ["sudden", "pleuritic", "dyspnea"]
-            }
-        },
-        
-        "esophageal_rupture": {
-            "name": "Ruptured Esophagus (Boerhaave Syndrome)",
-            "risk_factors": ["alcohol abuse", "caustic ingestion", "forceful vomiting"],
-            "typical_presentation": "Retrosternal pain following vomiting/retching",
-            "examination": "Subcutaneous emphysema in chest wall",
-            "essential_tests": ["CXR (pneumomediastinum)", "CT chest or gastrograffin swallow"],
-            "treatment": ["Broad-spectrum antibiotics", "Surgical consultation"],
-            "urgency": "EMERGENCY",
-            "likelihood_modifiers": {
-                "high_risk": ["alcohol_abuse", "recent_vomiting"],
-                "typical_symptoms": ["post_vomiting", "retrosternal"]
-            }
-        }
-    },
-    
-    "emergency_criteria": [
-        "STEMI on EKG",
-        "Aortic dissection symptoms (ripping/tearing pain)",
-        "Massive PE with hemodynamic instability",
-        "Tension pneumothorax",
-        "Esophageal rupture"
-    ],
-    
-    "red_flags": [
-        "Hemodynamic instability",
-        "New neurologic deficits",
-        "Pulse deficits",
-        "Severe respiratory distress",
-        "Subcutaneous emphysema"
+    return scores
+
+def _condition_scores(risk_mask: int, symptom_mask: int) -> np.ndarray:
+    """Scores in _CONDITIONS order: the njit kernel with numba, vectorized NumPy without"""
+    risk_mask = np.uint64(risk_mask)
+    symptom_mask = np.uint64(symptom_mask)
+    if HAS_NUMBA:
+        return _score_conditions(
+            risk_mask, symptom_mask, _COND_RISK_MASKS, _COND_SYMPTOM_MASKS, _COND_HIGH_RISK_MASKS, _SCORE_TABLE
+        )
+    return _SCORE_TABLE[
+        np.bitwise_count(_COND_RISK_MASKS & risk_mask),
+        np.bitwise_count(_COND_SYMPTOM_MASKS & symptom_mask),
+        np.bitwise_count(_COND_HIGH_RISK_MASKS & risk_mask)
     ]
-}
 
-def analyze_chest_pain_symptoms(symptoms: dict, patient_factors: dict) -> dict:
+if HAS_NUMBA:
+    # Compile (or load from cache) at import rather than on the first request
+    _condition_scores(0, 0)
+
+_SYMPTOM_MATCHER = TermMatcher(_SYMPTOM_BITS.items())
+
+def _risk_mask(patient_risk_factors) -> int:
+    """Mask of the condition risk terms containing any of the patient's risk factors"""
+    mask = 0
+    for rf in patient_risk_factors:
+        mask |= _RISK_SUBSTRING_MASKS.get(rf.lower(), 0)
+    return mask
+
+def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first; ties keep knowledge-base order"""
+    if scores.shape[0] > k:
+        # Partition to find the k-th best score, then only sort the candidates
+        # reaching it (np.argpartition alone would not keep ties in order)
+        kth_best = np.partition(scores, -k)[-k]
+        candidates = np.flatnonzero(scores >= kth_best)
+        return candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+    return np.argsort(-scores, kind="stable")
+
+def analyze_chest_pain_symptoms(symptoms: dict, patient_factors: dict) -> MappingProxyType:
     """
     Analyze chest pain symptoms using clinical knowledge base
     Returns structured assessment with differentials and urgency
     """
+    # Risk factors only matter through the terms they hit, so the mask is the cache key
+    return _assess_chest_pain(
+        symptoms.get("description", "").lower(),
+        _risk_mask(patient_factors.get("risk_factors", []))
+    )
+
+@lru_cache(maxsize=1024)
+def _assess_chest_pain(symptom_text: str, risk_mask: int) -> MappingProxyType:
+    """Assessment for a lowercased description and patient risk mask, cached and read-only"""
+    # One pass finds every term in the description
+    symptom_mask = _SYMPTOM_MATCHER.scan(symptom_text)
+    return _build_assessment(symptom_mask, _condition_scores(risk_mask, symptom_mask))
+
+def _build_assessment(symptom_mask: int, scores: np.ndarray) -> MappingProxyType:
+    """Read-only assessment from a patient's symptom mask and per-condition scores"""
     
-    assessment = {
-        "differentials": [],
-        "urgency": "URGENT",  # Default for chest pain
-        "recommended_tests": [],
-        "immediate_actions": CHEST_PAIN_KNOWLEDGE["initial_approach"]["mandatory_actions"]
-    }
+    urgency = Urgency.URGENT  # Default for chest pain
     
     # Analyze symptom descriptors
-    symptom_text = symptoms.get("description", "").lower()
-    
-    for descriptor, info in CHEST_PAIN_KNOWLEDGE["symptom_descriptors"].items():
-        if any(keyword in symptom_text for keyword in info["keywords"]):
-            assessment["differentials"].extend(info["differentials"])
-            if info["urgency"] == "EMERGENCY":
-                assessment["urgency"] = "EMERGENCY"
-    
-    # Calculate likelihood for each condition
-    condition_scores = {}
+    differentials = []
     
-    for condition_key, condition in CHEST_PAIN_KNOWLEDGE["conditions"].items():
-        score = 0.3  # Base probability for chest pain
-        
-        # Risk factor scoring
-        patient_risk_factors = patient_factors.get("risk_factors", [])
-        condition_risk_factors = condition["risk_factors"]
-        
-        for risk_factor in condition_risk_factors:
-            if any(rf.lower() in risk_factor.lower() for rf in patient_risk_factors):
-                score += 0.2
-        
-        # Symptom scoring
-        if "likelihood_modifiers" in condition:
-            modifiers = condition["likelihood_modifiers"]
-            
-            if "typical_symptoms" in modifiers:
-                for symptom in modifiers["typical_symptoms"]:
-                    if symptom in symptom_text:
-                        score += 0.25
-            
-            if "high_risk" in modifiers:
-                for risk in modifiers["high_risk"]:
-                    if any(rf.lower() in risk.lower() for rf in patient_risk_factors):
-                        score += 0.15
-        
-        condition_scores[condition_key] = min(score, 0.95)  # Cap at 95%
+    for keyword_mask, descriptor_differentials, descriptor_urgency in _DESCRIPTORS:
+        if symptom_mask & keyword_mask:
+            differentials += descriptor_differentials
+            urgency = max(urgency, descriptor_urgency)
     
-    # Sort by likelihood and create differential list
-    sorted_conditions = sorted(condition_scores.items(), key=lambda x: x[1], reverse=True)
+    # Select the top conditions by likelihood and create differential list
+    for index in _top_indices(scores, 4):  # Top 4
+        condition = _CONDITIONS[index]
+        differentials.append(MappingProxyType({
+            "condition": condition.name,
+            "likelihood": int(scores[index] * 100),
+            "description": condition.presentation,
+            "rationale": condition.rationale,
+            "urgency": condition.urgency.name
+        }))
     
-    for condition_key, likelihood in sorted_conditions[:4]:  # Top 4
-        condition = CHEST_PAIN_KNOWLEDGE["conditions"][condition_key]
-        assessment["differentials"].append({
-            "condition": condition["name"],
-            "likelihood": int(likelihood * 100),
-            "description": condition["typical_presentation"],
-            "rationale": f"Risk factors and symptom pattern consistent with {condition['name'].lower()}",
-            "urgency": condition["urgency"]
-        })
+    # Built read-only directly; the shared knowledge-base sections are already frozen
+    return MappingProxyType({
+        "differentials": tuple(differentials),
+        "urgency": urgency.name,
+        "recommended_tests": (),
+        "immediate_actions": CHEST_PAIN_KNOWLEDGE["initial_approach"]["mandatory_actions"]
+    })
+
+def analyze_chest_pain_symptoms_batch(descriptions: list, risk_factors_list: list) -> list:
+    """
+    Analyze a queue of chest pain patients at once
+    descriptions[i] and risk_factors_list[i] describe patient i; returns one
+    assessment per patient, identical to analyze_chest_pain_symptoms
+    Raises ValueError if the two lists differ in length
+    """
+    if len(descriptions) != len(risk_factors_list):
+        raise ValueError(
+            f"descriptions and risk_factors_list differ in length "
+            f"({len(descriptions)} != {len(risk_factors_list)})"
+        )
+    if not descriptions:
+        return []
+    symptom_masks = np.array(
+        _SYMPTOM_MATCHER.scan_many([description.lower() for description in descriptions]), dtype=np.uint64
+    )
+    risk_masks = np.array([_risk_mask(risk_factors) for risk_factors in risk_factors_list], dtype=np.uint64)
     
-    return assessment
\ No newline at end of file
+    # (patients, conditions) hit counts and scores in one broadcast
+    scores = _SCORE_TABLE[
+        np.bitwise_count(risk_masks[:, None] & _COND_RISK_MASKS[None, :]),
+        np.bitwise_count(symptom_masks[:, None] & _COND_SYMPTOM_MASKS[None, :]),
+        np.bitwise_count(risk_masks[:, None] & _COND_HIGH_RISK_MASKS[None, :])
+    ]
+    return [_build_assessment(int(symptom_mask), row) for symptom_mask, row in zip(symptom_masks, scores)]
@@ -3,7 +3,17 @@ Emergency Department Medical Systems Framework
 Based on structured clinical history-taking with 9 major systems
 """
 
-ED_SYSTEMS_FRAMEWORK = {
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+
+from medical_knowledge._frozen import freeze
+from medical_knowledge._matcher import TermMatcher
+
+# Static and shared by every request, so frozen (read-only, strings interned)
+ED_SYSTEMS_FRAMEWORK = freeze({
     "cardiovascular": {
         "presentations": ["chest pain", "palpitations", "syncope", "leg swelling", "heart pain"],
         "structured_questions": [
@@ -166,7 +176,7 @@ ED_SYSTEMS_FRAMEWORK = {
         },
         "teaching_pearl": "Any diabetic with vomiting + abdominal pain = suspect DKA"
     }
-}
+})
 
 GREETING_PATTERNS = [
     "hi", "hello", "hey", "good morning", "good afternoon", "good evening",
@@ -178,63 +188,207 @@ NON_MEDICAL_PATTERNS = [
     "i see", "understood", "got it", "alright", "fine"
 ]
 
-def identify_medical_system(user_message):
-    """Identify which medical system(s) the user's message relates to"""
-    message_lower = user_message.lower()
-    
-    # Check if it's a greeting or non-medical response
+_ACKNOWLEDGMENTS = frozenset(NON_MEDICAL_PATTERNS)
+# A leading greeting ending at a word boundary, plus the punctuation after it;
+# longest first, so "good morning" wins over any shorter greeting it starts with
+_GREETING_PREFIX_RE = re.compile(
+    "^(?:" + "|".join(map(re.escape, sorted(GREETING_PATTERNS, key=len, reverse=True))) + r")\b[\s,!.]*"
+)
+
+# Flat (system, presentation) index in framework order; queries go through it
+# and the automaton rather than walking the nested framework. Pair i gets bit i,
+# so matched systems come out in the same order and multiplicity as a nested
+# scan; the bit above them flags a greeting
+_PRESENTATION_INDEX = tuple(
+    (system, presentation)
+    for system, data in ED_SYSTEMS_FRAMEWORK.items() for presentation in data["presentations"]
+)
+_PRESENTATION_SYSTEMS = tuple(system for system, _ in _PRESENTATION_INDEX)
+_PRESENTATION_MASK = (1 << len(_PRESENTATION_INDEX)) - 1
+_GREETING_BIT = 1 << len(_PRESENTATION_INDEX)
+
+class _SystemSpec(NamedTuple):
+    """A framework system destructured once at import"""
+    red_flags: tuple
+    red_flag_shift: int       # each system's red flags take a run of phrase bits above the greeting bit
+    question_bits: dict       # question type -> bit; bit i is the i-th structured question
+    next_questions: tuple     # next question indexed by asked mask
+    teaching_pearl: str
+
+def _build_next_questions(system: str, data) -> tuple:
+    """Next question for every asked mask of the system, or None once all were asked"""
+    structured = data["structured_questions"]
+    # One shared read-only question object per question type
+    questions = {
+        question_type: MappingProxyType({
+            "question": data["key_questions"][question_type],
+            "type": question_type,
+            "system": system
+        })
+        for question_type in structured
+    }
+    table = []
+    for asked_mask in range(1 << len(structured)):
+        remaining = ~asked_mask & ((1 << len(structured)) - 1)
+        if not remaining:
+            table.append(None)
+            continue
+        question_type = structured[(remaining & -remaining).bit_length() - 1]
+        table.append(questions[question_type])
+    return tuple(table)
+
+def _build_system_specs() -> dict:
+    """system -> _SystemSpec, in framework order"""
+    specs = {}
+    shift = len(_PRESENTATION_INDEX) + 1
+    for system, data in ED_SYSTEMS_FRAMEWORK.items():
+        specs[system] = _SystemSpec(
+            red_flags=data["red_flags"],
+            red_flag_shift=shift,
+            question_bits={question_type: 1 << i for i, question_type in enumerate(data["structured_questions"])},
+            # The framework is static, so the whole next-question decision is evaluated here
+            next_questions=_build_next_questions(system, data),
+            teaching_pearl=data["teaching_pearl"]
+        )
+        shift += len(data["red_flags"])
+    return specs
+
+_SYSTEM_SPECS = _build_system_specs()
+
+def _phrase_masks():
+    """(phrase, bit) pairs for every presentation, greeting and lowercased red flag"""
+    for i, (_, presentation) in enumerate(_PRESENTATION_INDEX):
+        yield presentation, 1 << i
     for pattern in GREETING_PATTERNS:
-        if pattern in message_lower:
-            return "greeting"
+        yield pattern, _GREETING_BIT
+    for spec in _SYSTEM_SPECS.values():
+        for i, red_flag in enumerate(spec.red_flags):
+            yield red_flag.lower(), 1 << (spec.red_flag_shift + i)
+
+_PHRASE_MATCHER = TermMatcher(_phrase_masks())
+
+def _systems(mask: int) -> tuple:
+    """One system per presentation bit in the mask, lowest bit first"""
+    mask &= _PRESENTATION_MASK
+    matching_systems = []
+    while mask:
+        lowest = mask & -mask
+        matching_systems.append(_PRESENTATION_SYSTEMS[lowest.bit_length() - 1])
+        mask ^= lowest
+    return tuple(matching_systems)
+
+def _classification(stripped: str, mask: int):
+    """Classify a message from its stripped text and phrase bits: "greeting", "acknowledgment" or a tuple of systems"""
+    # Check if it's a greeting or non-medical response
+    if mask & _GREETING_BIT:
+        # A leading greeting ("good morning, I have chest pain") no longer hides
+        # the complaint after it. Only whole words count, so "hives" or "hip
+        # pain" are not read as "hi" plus a fragment
+        greeting = _GREETING_PREFIX_RE.match(stripped)
+        if greeting:
+            remainder_systems = _systems(_PHRASE_MATCHER.scan(stripped[greeting.end():]))
+            if remainder_systems:
+                return remainder_systems
+        return "greeting"
     
-    for pattern in NON_MEDICAL_PATTERNS:
-        if message_lower.strip() == pattern:
-            return "acknowledgment"
+    if stripped in _ACKNOWLEDGMENTS:
+        return "acknowledgment"
     
-    matching_systems = []
+    return _systems(mask) or ("general",)
+
+# Exact greetings and acknowledgments are classified and scanned at import. No
+# phrase starts or ends with whitespace, so surrounding whitespace never
+# changes what matches
+def _build_exact_messages() -> dict:
+    """stripped message -> (classification, phrase bits) for every greeting and acknowledgment"""
+    exact = {}
+    for phrase in (*GREETING_PATTERNS, *NON_MEDICAL_PATTERNS):
+        mask = _PHRASE_MATCHER.scan(phrase)
+        exact[phrase] = (_classification(phrase, mask), mask)
+    return exact
+
+_EXACT_MESSAGES = _build_exact_messages()
+
+@dataclass(slots=True, frozen=True)
+class ClassifyContext:
+    """Everything the query functions need from one message, from a single scan"""
+    raw: str
+    lower: str
+    classification: object    # "greeting", "acknowledgment" or a tuple of systems
+    phrase_mask: int          # presentation, greeting and red flag bits
+
+@lru_cache(maxsize=1024)
+def classify(user_message: str) -> ClassifyContext:
+    """
+    Lowercase and scan a message once; identify_medical_system and
+    check_red_flags read their answers from the (cached) context
+    """
+    message_lower = user_message.lower()
+    stripped = message_lower.strip()
     
-    for system, data in ED_SYSTEMS_FRAMEWORK.items():
-        for presentation in data["presentations"]:
-            if presentation in message_lower:
-                matching_systems.append(system)
+    # Exact greetings and acknowledgments need no scan
+    exact = _EXACT_MESSAGES.get(stripped)
+    if exact is not None:
+        return ClassifyContext(user_message, message_lower, *exact)
     
-    return matching_systems if matching_systems else ["general"]
+    mask = _PHRASE_MATCHER.scan(message_lower)
+    return ClassifyContext(user_message, message_lower, _classification(stripped, mask), mask)
+
+def identify_medical_system(user_message):
+    """Identify which medical system(s) the user's message relates to"""
+    classification = classify(user_message).classification
+    # Callers get their own list; the cached tuple is shared
+    return classification if isinstance(classification, str) else list(classification)
+
+def identify_medical_systems_batch(user_messages: list) -> list:
+    """
+    Identify the medical systems of many messages at once (e.g. stored chat logs)
+    Returns one result per message, identical to identify_medical_system
+    """
+    messages_lower = [user_message.lower() for user_message in user_messages]
+    results = []
+    for message_lower, mask in zip(messages_lower, _PHRASE_MATCHER.scan_many(messages_lower)):
+        classification = _classification(message_lower.strip(), mask)
+        results.append(classification if isinstance(classification, str) else list(classification))
+    return results
 
 def get_structured_questions(system, conversation_state):
-    """Get next structured question based on medical system and conversation state"""
-    if system not in ED_SYSTEMS_FRAMEWORK:
+    """
+    Get next structured question based on medical system and conversation state
+    Asked questions come from the conversation_state["asked_questions"] collection
+    of question types; keep that a set so it is probed once per question type
+    instead of scanned
+    The question is shared and returned read-only
+    """
+    spec = _SYSTEM_SPECS.get(system)
+    if spec is None:
         return None
     
-    system_data = ED_SYSTEMS_FRAMEWORK[system]
+    # Bit i set once the system's i-th structured question was asked
+    asked_mask = 0
+    question_bits = spec.question_bits
     asked_questions = conversation_state.get("asked_questions", [])
+    if isinstance(asked_questions, (set, frozenset)):
+        for question_type, bit in question_bits.items():
+            if question_type in asked_questions:
+                asked_mask |= bit
+    else:
+        for question_type in asked_questions:
+            asked_mask |= question_bits.get(question_type, 0)
     
-    # Find next question to ask
-    for question_type in system_data["structured_questions"]:
-        if question_type not in asked_questions:
-            return {
-                "question": system_data["key_questions"][question_type],
-                "type": question_type,
-                "system": system
-            }
-    
-    return None
+    return spec.next_questions[asked_mask]
 
 def check_red_flags(user_message, system):
     """Check for red flag symptoms that need immediate attention"""
-    if system not in ED_SYSTEMS_FRAMEWORK:
+    spec = _SYSTEM_SPECS.get(system)
+    if spec is None:
         return []
     
-    message_lower = user_message.lower()
-    red_flags_found = []
-    
-    for red_flag in ED_SYSTEMS_FRAMEWORK[system]["red_flags"]:
-        if red_flag.lower() in message_lower:
-            red_flags_found.append(red_flag)
+    mask = classify(user_message).phrase_mask >> spec.red_flag_shift
     
-    return red_flags_found
+    return [red_flag for i, red_flag in enumerate(spec.red_flags) if mask >> i & 1]
 
 def get_teaching_pearl(system):
     """Get the teaching pearl for the medical system"""
-    if system in ED_SYSTEMS_FRAMEWORK:
-        return ED_SYSTEMS_FRAMEWORK[system]["teaching_pearl"]
-    return None
\ No newline at end of file
+    spec = _SYSTEM_SPECS.get(system)
+    return spec.teaching_pearl if spec is not None else None
\ No newline at end of file
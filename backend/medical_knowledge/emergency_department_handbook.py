@@ -3,240 +3,431 @@ Advanced Emergency Department Medical Knowledge System
 Comprehensive medical knowledge base with adaptive learning capabilities
 """
 
-from typing import Dict, List, Any, Optional, Tuple
-import re
+from typing import Dict, List, Any, NamedTuple, Tuple
 import json
-from datetime import datetime, timezone
+import hashlib
+from collections import Counter, deque
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from functools import lru_cache
+from heapq import nlargest
+from types import MappingProxyType
 
-class EDMedicalKnowledge:
-    """Emergency Department Medical Knowledge System with Learning Capabilities"""
+from medical_knowledge._frozen import freeze
+from medical_knowledge._matcher import TermMatcher
+
+# Symptom category keywords, in priority order; the first category with a match wins
+SYMPTOM_PATTERNS = {
+    "fever": ["fever", "temperature", "hot", "chills", "rigors", "night sweats"],
+    "chest_pain": ["chest pain", "chest hurt", "heart pain", "chest pressure", "chest tightness"],
+    "shortness_of_breath": ["shortness of breath", "short of breath", "difficulty breathing", "can't breathe", "breathing problems", "dyspnea"],
+    "abdominal_pain": ["stomach pain", "abdominal pain", "belly pain", "stomach ache", "abdominal cramps"],
+    "headache": ["headache", "head pain", "migraine", "head hurts", "skull pain"]
+}
+
+SEVERE_INDICATORS = ["severe", "worst ever", "crushing", "sudden", "can't breathe", "unbearable"]
+MODERATE_INDICATORS = ["moderate", "significant", "concerning", "worsening"]
+
+def _pattern_keyword_groups(pattern: str) -> Tuple[Tuple[str, ...], ...]:
+    """Keyword groups of a diagnostic pattern; it matches when every keyword of some group occurs"""
+    return tuple(tuple(group.strip().split()) for group in pattern.replace("_", " ").split("/"))
+
+# Comprehensive ED medical knowledge; static and shared by every instance, so
+# built once at import and frozen (read-only, lists as tuples, strings interned)
+KNOWLEDGE_BASE = freeze({
+    "fever": {
+        "follow_up_questions": [
+            "What's your maximum temperature and when did it start?",
+            "Any localizing symptoms: cough, SOB, dysuria, flank pain, abdominal pain, rash, headache, neck stiffness?",
+            "Recent travel, animal exposure, sick contacts, unusual food/water?",
+            "Any immunocompromising conditions, recent procedures, or new medications?"
+        ],
+        "red_flags": [
+            "hypotension", "altered mental status", "lactate elevation", "new oxygen requirement",
+            "respiratory distress", "petechiae", "purpura", "neck stiffness with AMS",
+            "severe focal pain with crepitus", "neutropenia", "pregnancy with abdominal pain"
+        ],
+        "provisional_diagnoses": {
+            "fever + cough/SOB": ["Community-acquired pneumonia", "Influenza", "COVID-19", "Pulmonary embolism", "CHF", "ARDS"],
+            "fever + dysuria/flank_pain": ["Pyelonephritis", "Obstructive uropathy with stone"],
+            "fever + RUQ_pain/jaundice": ["Cholecystitis", "Cholangitis"],
+            "fever + headache/neck_stiffness": ["Meningitis", "Encephalitis"],
+            "fever + new_murmur/joint_pain": ["Endocarditis"],
+            "fever + abdominal_pain/diarrhea": ["Gastroenteritis", "Colitis", "Appendicitis", "Typhoid"]
+        },
+        "investigations": {
+            "bedside": ["Vitals trend", "POC glucose", "PoCUS lungs/IVC/gallbladder/kidneys", "rash and meningeal exam"],
+            "labs": ["CBC with diff", "CMP", "lactate", "blood cultures x2", "UA & culture", "pregnancy test"],
+            "imaging": ["CXR if respiratory symptoms", "RUQ US if RUQ pain/jaundice", "CT A/P if severe abdominal pain"]
+        },
+        "triage": {
+            "RED": ["Septic shock features", "meningitis suspicion", "febrile neutropenia", "purpura fulminans"],
+            "ORANGE": ["Possible sepsis without shock", "high fever with focal severe pain", "immunocompromised fever"],
+            "YELLOW": ["Moderate fever with stable vitals and localizing symptoms"],
+            "GREEN": ["Low-grade viral syndrome", "stable with reliable follow-up"]
+        }
+    },
     
-    def __init__(self):
-        self.knowledge_base = self._initialize_knowledge_base()
-        self.triage_system = self._initialize_triage_system()
-        self.learning_patterns = {}  # Store successful response patterns
-        
-    def _initialize_knowledge_base(self) -> Dict[str, Any]:
-        """Initialize comprehensive ED medical knowledge"""
-        return {
-            "fever": {
-                "follow_up_questions": [
-                    "What's your maximum temperature and when did it start?",
-                    "Any localizing symptoms: cough, SOB, dysuria, flank pain, abdominal pain, rash, headache, neck stiffness?",
-                    "Recent travel, animal exposure, sick contacts, unusual food/water?",
-                    "Any immunocompromising conditions, recent procedures, or new medications?"
-                ],
-                "red_flags": [
-                    "hypotension", "altered mental status", "lactate elevation", "new oxygen requirement",
-                    "respiratory distress", "petechiae", "purpura", "neck stiffness with AMS",
-                    "severe focal pain with crepitus", "neutropenia", "pregnancy with abdominal pain"
-                ],
-                "provisional_diagnoses": {
-                    "fever + cough/SOB": ["Community-acquired pneumonia", "Influenza", "COVID-19", "Pulmonary embolism", "CHF", "ARDS"],
-                    "fever + dysuria/flank_pain": ["Pyelonephritis", "Obstructive uropathy with stone"],
-                    "fever + RUQ_pain/jaundice": ["Cholecystitis", "Cholangitis"],
-                    "fever + headache/neck_stiffness": ["Meningitis", "Encephalitis"],
-                    "fever + new_murmur/joint_pain": ["Endocarditis"],
-                    "fever + abdominal_pain/diarrhea": ["Gastroenteritis", "Colitis", "Appendicitis", "Typhoid"]
-                },
-                "investigations": {
-                    "bedside": ["Vitals trend", "POC glucose", "PoCUS lungs/IVC/gallbladder/kidneys", "rash and meningeal exam"],
-                    "labs": ["CBC with diff", "CMP", "lactate", "blood cultures x2", "UA & culture", "pregnancy test"],
-                    "imaging": ["CXR if respiratory symptoms", "RUQ US if RUQ pain/jaundice", "CT A/P if severe abdominal pain"]
-                },
-                "triage": {
-                    "RED": ["Septic shock features", "meningitis suspicion", "febrile neutropenia", "purpura fulminans"],
-                    "ORANGE": ["Possible sepsis without shock", "high fever with focal severe pain", "immunocompromised fever"],
-                    "YELLOW": ["Moderate fever with stable vitals and localizing symptoms"],
-                    "GREEN": ["Low-grade viral syndrome", "stable with reliable follow-up"]
-                }
-            },
-            
-            "chest_pain": {
-                "follow_up_questions": [
-                    "Onset: sudden vs gradual? Character: pressure/tearing/pleuritic?",
-                    "Radiation to jaw, arm, or back? Triggers or exertion-related?",
-                    "Duration and what relieves it: rest, leaning forward, antacids?",
-                    "Associated symptoms: SOB, diaphoresis, syncope, hemoptysis?",
-                    "Risk factors: CAD history, HTN, pregnancy, cocaine use?"
-                ],
-                "red_flags": [
-                    "hemodynamic instability", "syncope", "new neurologic deficit", 
-                    "severe ripping pain", "hypoxia", "ST-elevation", "Wellen's pattern",
-                    "widened mediastinum", "tamponade signs"
-                ],
-                "provisional_diagnoses": {
-                    "cardiac": ["Acute coronary syndrome", "Myocardial infarction", "Pericarditis", "Myopericarditis", "Cardiac tamponade"],
-                    "vascular": ["Aortic dissection", "Pulmonary embolism"],
-                    "pulmonary": ["Pneumothorax", "Tension pneumothorax"],
-                    "other": ["Esophageal rupture", "GERD", "Musculoskeletal"]
-                },
-                "investigations": {
-                    "immediate": ["ECG repeat q15-30min", "serial troponin", "CXR", "POCUS cardiac/aortic/lung"],
-                    "conditional": ["D-dimer if low-intermediate PE probability", "CTA chest for PE/dissection", "Echo if tamponade"],
-                    "risk_tools": ["HEART score for disposition", "Wells + PERC for PE pathway"]
-                },
-                "triage": {
-                    "RED": ["STEMI", "shock", "persistent severe hypoxia", "tamponade", "unstable dissection"],
-                    "ORANGE": ["NSTEMI/ongoing ischemia", "high-probability PE stable", "stable dissection"],
-                    "YELLOW": ["Low-intermediate risk needing serial monitoring"],
-                    "GREEN": ["Reproducible chest wall pain", "normal ECG", "low risk after screening"]
-                }
-            },
-            
-            "shortness_of_breath": {
-                "follow_up_questions": [
-                    "Onset and tempo? Positional: orthopnea, PND?",
-                    "Wheeze or stridor? Cough, sputum production, fever?",
-                    "Pleuritic pain or hemoptysis? Leg swelling?",
-                    "Recent immobilization, surgery, or travel?",
-                    "Inhalational or toxin exposure?"
-                ],
-                "red_flags": [
-                    "accessory muscle use", "SpO2 <90% on room air", "altered mental status",
-                    "silent chest", "impending fatigue", "hypotension"
-                ],
-                "provisional_diagnoses": [
-                    "Asthma/COPD exacerbation", "Pneumonia", "Pulmonary embolism", 
-                    "Acute cardiogenic pulmonary edema", "Pneumothorax/tension", 
-                    "ARDS", "Upper airway obstruction"
-                ],
-                "investigations": {
-                    "bedside": ["SpO2", "ABG/VBG if severe", "POCUS BLUE-pattern", "ECG"],
-                    "labs": ["CBC", "BMP", "troponin/BNP if CHF", "D-dimer per probability", "cultures if septic"],
-                    "imaging": ["CXR", "CT pulmonary angiography if PE", "US thorax", "Echo for LV failure"]
-                },
-                "triage": {
-                    "RED": ["Tension pneumothorax", "status asthmaticus", "severe hypoxemia", "impending arrest"],
-                    "ORANGE": ["Moderate respiratory distress", "pneumonia with hypoxia", "suspected PE/CHF stable"],
-                    "YELLOW": ["Mild-moderate SOB needing treatment"],
-                    "GREEN": ["Mild SOB with clear benign cause and normal vitals"]
-                }
-            },
-            
-            "abdominal_pain": {
-                "follow_up_questions": [
-                    "Location: RUQ/RLQ/epigastric/suprapubic/diffuse?",
-                    "Onset: colicky vs constant, sudden 'tearing'?",
-                    "Radiation to back, shoulder, or groin?",
-                    "Vomiting, diarrhea, constipation? Last BM/flatus?",
-                    "GI bleed: melena, hematochezia, hematemesis?",
-                    "Urinary symptoms? LMP/pregnancy? Prior surgeries?"
-                ],
-                "red_flags": [
-                    "shock", "peritonitis/rigidity", "GI hemorrhage with instability",
-                    "severe sudden pain (AAA/mesenteric ischemia)", "pregnancy with pain/bleeding"
-                ],
-                "provisional_diagnoses": {
-                    "RLQ": ["Appendicitis (use Alvarado score)"],
-                    "RUQ": ["Cholecystitis", "Cholangitis"],
-                    "epigastric_to_back": ["Pancreatitis (lipase; BISAP/Ranson)", "Perforated ulcer"],
-                    "diffuse_colicky": ["Small bowel obstruction"],
-                    "upper_gi_bleed": ["PUD", "Varices", "Mallory-Weiss tear"],
-                    "systemic": ["AAA in older/smoker with back/abdominal pain"]
-                },
-                "investigations": {
-                    "bedside": ["FAST if unstable", "RUQ US", "Aortic US for AAA", "Pelvic US & β-hCG"],
-                    "labs": ["CBC", "CMP", "lipase", "lactate", "type & screen if bleeding", "UA", "β-hCG"],
-                    "imaging": ["CXR for free air", "CT A/P with contrast", "Endoscopy for UGIB"]
-                },
-                "triage": {
-                    "RED": ["Hemodynamic instability", "peritonitis", "AAA suspicion", "massive GI bleed"],
-                    "ORANGE": ["Moderate dehydration", "suspected appendicitis/cholecystitis stable", "upper GI bleed stable"],
-                    "YELLOW": ["Localized pain needing imaging/observation"],
-                    "GREEN": ["Benign abdominal pain with reassuring exam"]
-                }
-            },
-            
-            "headache": {
-                "follow_up_questions": [
-                    "Thunderclap onset? Worst headache ever? Onset-to-peak seconds?",
-                    "Triggers: exertion, sexual activity? Neck stiffness, fever?",
-                    "Focal deficits, visual changes? Jaw claudication?",
-                    "Carbon monoxide exposure? Pregnancy/postpartum?",
-                    "Anticoagulants or recent trauma?"
-                ],
-                "red_flags": [
-                    "thunderclap", "neurologic deficit/AMS", "papilledema", 
-                    "fever with meningeal signs", "pregnancy/puerperium", 
-                    "cancer/HIV", "anticoagulation/trauma"
-                ],
-                "provisional_diagnoses": [
-                    "Subarachnoid hemorrhage", "Intracerebral hemorrhage", 
-                    "Meningitis/encephalitis", "Cerebral venous thrombosis",
-                    "Temporal arteritis", "Acute angle-closure glaucoma",
-                    "Primary headaches (migraine, tension, cluster)"
-                ],
-                "investigations": {
-                    "immediate": ["POC glucose", "Neuro exam + NIHSS if deficits"],
-                    "imaging": ["Non-contrast head CT ± CTA head/neck", "LP if SAH suspected with negative CT"],
-                    "labs": ["CBC", "BMP", "Blood cultures if meningitis suspected"]
-                },
-                "triage": {
-                    "RED": ["Suspected SAH/meningitis/ICH", "focal deficits with sudden onset"],
-                    "ORANGE": ["Severe intractable pain with systemic symptoms", "new neuro findings stable"],
-                    "YELLOW": ["Typical migraine/tension requiring ED therapy"],
-                    "GREEN": ["Known benign pattern", "improved with simple therapy", "normal exam"]
-                }
-            }
+    "chest_pain": {
+        "follow_up_questions": [
+            "Onset: sudden vs gradual? Character: pressure/tearing/pleuritic?",
+            "Radiation to jaw, arm, or back? Triggers or exertion-related?",
+            "Duration and what relieves it: rest, leaning forward, antacids?",
+            "Associated symptoms: SOB, diaphoresis, syncope, hemoptysis?",
+            "Risk factors: CAD history, HTN, pregnancy, cocaine use?"
+        ],
+        "red_flags": [
+            "hemodynamic instability", "syncope", "new neurologic deficit", 
+            "severe ripping pain", "hypoxia", "ST-elevation", "Wellen's pattern",
+            "widened mediastinum", "tamponade signs"
+        ],
+        "provisional_diagnoses": {
+            "cardiac": ["Acute coronary syndrome", "Myocardial infarction", "Pericarditis", "Myopericarditis", "Cardiac tamponade"],
+            "vascular": ["Aortic dissection", "Pulmonary embolism"],
+            "pulmonary": ["Pneumothorax", "Tension pneumothorax"],
+            "other": ["Esophageal rupture", "GERD", "Musculoskeletal"]
+        },
+        "investigations": {
+            "immediate": ["ECG repeat q15-30min", "serial troponin", "CXR", "POCUS cardiac/aortic/lung"],
+            "conditional": ["D-dimer if low-intermediate PE probability", "CTA chest for PE/dissection", "Echo if tamponade"],
+            "risk_tools": ["HEART score for disposition", "Wells + PERC for PE pathway"]
+        },
+        "triage": {
+            "RED": ["STEMI", "shock", "persistent severe hypoxia", "tamponade", "unstable dissection"],
+            "ORANGE": ["NSTEMI/ongoing ischemia", "high-probability PE stable", "stable dissection"],
+            "YELLOW": ["Low-intermediate risk needing serial monitoring"],
+            "GREEN": ["Reproducible chest wall pain", "normal ECG", "low risk after screening"]
         }
+    },
     
-    def _initialize_triage_system(self) -> Dict[str, Any]:
-        """Initialize color-coded triage system"""
-        return {
-            "RED": {
-                "description": "Life-threat, resuscitation NOW",
-                "time_target": "Immediate",
-                "universal_actions": [
-                    "Monitor", "IV/IO access", "O₂ as needed", "POC glucose",
-                    "12-lead ECG if cardiopulmonary/AMS", "PoCUS when helpful",
-                    "Pregnancy test in childbearing potential", "Analgesia/antipyretic as appropriate"
-                ]
-            },
-            "ORANGE": {
-                "description": "Very Urgent: High risk; start treatment ≤10 min",
-                "time_target": "≤10 minutes",
-                "universal_actions": ["Same as RED with monitoring"]
-            },
-            "YELLOW": {
-                "description": "Urgent: Significant illness; start ≤60 min",
-                "time_target": "≤60 minutes",
-                "universal_actions": ["Standard monitoring and assessment"]
-            },
-            "GREEN": {
-                "description": "Standard: Minor/stable; start ≤240 min",
-                "time_target": "≤240 minutes",
-                "universal_actions": ["Routine monitoring"]
+    "shortness_of_breath": {
+        "follow_up_questions": [
+            "Onset and tempo? Positional: orthopnea, PND?",
+            "Wheeze or stridor? Cough, sputum production, fever?",
+            "Pleuritic pain or hemoptysis? Leg swelling?",
+            "Recent immobilization, surgery, or travel?",
+            "Inhalational or toxin exposure?"
+        ],
+        "red_flags": [
+            "accessory muscle use", "SpO2 <90% on room air", "altered mental status",
+            "silent chest", "impending fatigue", "hypotension"
+        ],
+        "provisional_diagnoses": [
+            "Asthma/COPD exacerbation", "Pneumonia", "Pulmonary embolism", 
+            "Acute cardiogenic pulmonary edema", "Pneumothorax/tension", 
+            "ARDS", "Upper airway obstruction"
+        ],
+        "investigations": {
+            "bedside": ["SpO2", "ABG/VBG if severe", "POCUS BLUE-pattern", "ECG"],
+            "labs": ["CBC", "BMP", "troponin/BNP if CHF", "D-dimer per probability", "cultures if septic"],
+            "imaging": ["CXR", "CT pulmonary angiography if PE", "US thorax", "Echo for LV failure"]
+        },
+        "triage": {
+            "RED": ["Tension pneumothorax", "status asthmaticus", "severe hypoxemia", "impending arrest"],
+            "ORANGE": ["Moderate respiratory distress", "pneumonia with hypoxia", "suspected PE/CHF stable"],
+            "YELLOW": ["Mild-moderate SOB needing treatment"],
+            "GREEN": ["Mild SOB with clear benign cause and normal vitals"]
+        }
+    },
+    
+    "abdominal_pain": {
+        "follow_up_questions": [
+            "Location: RUQ/RLQ/epigastric/suprapubic/diffuse?",
+            "Onset: colicky vs constant, sudden 'tearing'?",
+            "Radiation to back, shoulder, or groin?",
+            "Vomiting, diarrhea, constipation? Last BM/flatus?",
+            "GI bleed: melena, hematochezia, hematemesis?",
+            "Urinary symptoms? LMP/pregnancy? Prior surgeries?"
+        ],
+        "red_flags": [
+            "shock", "peritonitis/rigidity", "GI hemorrhage with instability",
+            "severe sudden pain (AAA/mesenteric ischemia)", "pregnancy with pain/bleeding"
+        ],
+        "provisional_diagnoses": {
+            "RLQ": ["Appendicitis (use Alvarado score)"],
+            "RUQ": ["Cholecystitis", "Cholangitis"],
+            "epigastric_to_back": ["Pancreatitis (lipase; BISAP/Ranson)", "Perforated ulcer"],
+            "diffuse_colicky": ["Small bowel obstruction"],
+            "upper_gi_bleed": ["PUD", "Varices", "Mallory-Weiss tear"],
+            "systemic": ["AAA in older/smoker with back/abdominal pain"]
+        },
+        "investigations": {
+            "bedside": ["FAST if unstable", "RUQ US", "Aortic US for AAA", "Pelvic US & β-hCG"],
+            "labs": ["CBC", "CMP", "lipase", "lactate", "type & screen if bleeding", "UA", "β-hCG"],
+            "imaging": ["CXR for free air", "CT A/P with contrast", "Endoscopy for UGIB"]
+        },
+        "triage": {
+            "RED": ["Hemodynamic instability", "peritonitis", "AAA suspicion", "massive GI bleed"],
+            "ORANGE": ["Moderate dehydration", "suspected appendicitis/cholecystitis stable", "upper GI bleed stable"],
+            "YELLOW": ["Localized pain needing imaging/observation"],
+            "GREEN": ["Benign abdominal pain with reassuring exam"]
+        }
+    },
+    
+    "headache": {
+        "follow_up_questions": [
+            "Thunderclap onset? Worst headache ever? Onset-to-peak seconds?",
+            "Triggers: exertion, sexual activity? Neck stiffness, fever?",
+            "Focal deficits, visual changes? Jaw claudication?",
+            "Carbon monoxide exposure? Pregnancy/postpartum?",
+            "Anticoagulants or recent trauma?"
+        ],
+        "red_flags": [
+            "thunderclap", "neurologic deficit/AMS", "papilledema", 
+            "fever with meningeal signs", "pregnancy/puerperium", 
+            "cancer/HIV", "anticoagulation/trauma"
+        ],
+        "provisional_diagnoses": [
+            "Subarachnoid hemorrhage", "Intracerebral hemorrhage", 
+            "Meningitis/encephalitis", "Cerebral venous thrombosis",
+            "Temporal arteritis", "Acute angle-closure glaucoma",
+            "Primary headaches (migraine, tension, cluster)"
+        ],
+        "investigations": {
+            "immediate": ["POC glucose", "Neuro exam + NIHSS if deficits"],
+            "imaging": ["Non-contrast head CT ± CTA head/neck", "LP if SAH suspected with negative CT"],
+            "labs": ["CBC", "BMP", "Blood cultures if meningitis suspected"]
+        },
+        "triage": {
+            "RED": ["Suspected SAH/meningitis/ICH", "focal deficits with sudden onset"],
+            "ORANGE": ["Severe intractable pain with systemic symptoms", "new neuro findings stable"],
+            "YELLOW": ["Typical migraine/tension requiring ED therapy"],
+            "GREEN": ["Known benign pattern", "improved with simple therapy", "normal exam"]
+        }
+    }
+})
+
+# Color-coded triage system
+TRIAGE_SYSTEM = freeze({
+    "RED": {
+        "description": "Life-threat, resuscitation NOW",
+        "time_target": "Immediate",
+        "universal_actions": [
+            "Monitor", "IV/IO access", "O₂ as needed", "POC glucose",
+            "12-lead ECG if cardiopulmonary/AMS", "PoCUS when helpful",
+            "Pregnancy test in childbearing potential", "Analgesia/antipyretic as appropriate"
+        ]
+    },
+    "ORANGE": {
+        "description": "Very Urgent: High risk; start treatment ≤10 min",
+        "time_target": "≤10 minutes",
+        "universal_actions": ["Same as RED with monitoring"]
+    },
+    "YELLOW": {
+        "description": "Urgent: Significant illness; start ≤60 min",
+        "time_target": "≤60 minutes",
+        "universal_actions": ["Standard monitoring and assessment"]
+    },
+    "GREEN": {
+        "description": "Standard: Minor/stable; start ≤240 min",
+        "time_target": "≤240 minutes",
+        "universal_actions": ["Routine monitoring"]
+    }
+})
+
+class _TermIndex(NamedTuple):
+    matcher: TermMatcher
+    category_masks: tuple           # (category, mask of its patterns), in priority order
+    red_flag_masks: dict            # category -> mask of its lowercased red flags
+    severe_mask: int
+    moderate_mask: int
+    diagnosis_group_masks: dict     # category -> {pattern: (mask per keyword group)}
+
+def _build_term_index(knowledge_base) -> _TermIndex:
+    """Put every keyword the analysis looks for into one matcher, with per-use bitmasks"""
+    red_flags = {
+        category: [flag.lower() for flag in knowledge.get("red_flags", [])]
+        for category, knowledge in knowledge_base.items()
+    }
+    diagnosis_groups = {
+        category: {pattern: _pattern_keyword_groups(pattern) for pattern in knowledge["provisional_diagnoses"]}
+        for category, knowledge in knowledge_base.items()
+        if isinstance(knowledge.get("provisional_diagnoses"), Mapping)
+    }
+    
+    terms = [term for patterns in SYMPTOM_PATTERNS.values() for term in patterns]
+    terms += [flag for flags in red_flags.values() for flag in flags]
+    terms += SEVERE_INDICATORS + MODERATE_INDICATORS
+    terms += [
+        keyword
+        for patterns in diagnosis_groups.values() for groups in patterns.values()
+        for group in groups for keyword in group
+    ]
+    matcher = TermMatcher.from_terms(terms)
+    
+    return _TermIndex(
+        matcher=matcher,
+        category_masks=tuple(
+            (category, matcher.mask(patterns)) for category, patterns in SYMPTOM_PATTERNS.items()
+        ),
+        red_flag_masks={category: matcher.mask(flags) for category, flags in red_flags.items()},
+        severe_mask=matcher.mask(SEVERE_INDICATORS),
+        moderate_mask=matcher.mask(MODERATE_INDICATORS),
+        diagnosis_group_masks={
+            category: {
+                pattern: tuple(matcher.mask(group) for group in groups)
+                for pattern, groups in patterns.items()
             }
+            for category, patterns in diagnosis_groups.items()
         }
+    )
+
+_TERM_INDEX = _build_term_index(KNOWLEDGE_BASE)
+
+def _investigations_by_triage(investigations) -> Dict[str, Any]:
+    """Recommended investigations for each triage level, from a symptom's full investigations"""
+    return {
+        # Include all investigations for high-acuity patients
+        "RED": investigations,
+        "ORANGE": investigations,
+        # Focus on essential investigations
+        "YELLOW": freeze({
+            "bedside": investigations.get("bedside", [])[:2],
+            "labs": investigations.get("labs", [])[:3],
+            "imaging": investigations.get("imaging", [])[:1]
+        }),
+        # Minimal investigations
+        "GREEN": freeze({
+            "bedside": investigations.get("bedside", [])[:1],
+            "labs": ["Basic metabolic panel as indicated"],
+            "imaging": ["As clinically indicated"]
+        })
+    }
+
+# symptom category -> triage level -> recommended investigations
+_RECOMMENDED_INVESTIGATIONS = {
+    category: _investigations_by_triage(knowledge.get("investigations", {}))
+    for category, knowledge in KNOWLEDGE_BASE.items()
+}
+
+def _wrap_diagnoses(diagnoses) -> tuple:
+    """Frozen response entries for the first three diagnoses"""
+    return freeze([{"diagnosis": dx, "likelihood": "Consider based on presentation"} for dx in diagnoses[:3]])
+
+def _wrapped_diagnoses(diagnoses_data):
+    """A symptom's provisional diagnoses as response entries, per pattern when they are keyed by pattern"""
+    if isinstance(diagnoses_data, Mapping):
+        return {pattern: _wrap_diagnoses(diagnoses) for pattern, diagnoses in diagnoses_data.items()}
+    elif isinstance(diagnoses_data, (list, tuple)):
+        return _wrap_diagnoses(diagnoses_data)
+    return ()
+
+# symptom category -> provisional diagnoses response entries (by pattern, or one tuple)
+_PROVISIONAL_DIAGNOSES = {
+    category: _wrapped_diagnoses(knowledge.get("provisional_diagnoses", {}))
+    for category, knowledge in KNOWLEDGE_BASE.items()
+}
+
+# Entries of each symptom's first pattern, used when no pattern matches
+_DEFAULT_DIAGNOSES = {
+    category: next(iter(by_pattern.values()), ())
+    for category, by_pattern in _PROVISIONAL_DIAGNOSES.items()
+    if isinstance(by_pattern, dict)
+}
+
+# Medical terms a learning pattern key is made of, sorted so that bit order is key order
+PATTERN_KEY_TERMS = tuple(sorted(
+    ["pain", "fever", "headache", "nausea", "dizzy", "shortness", "breathing", "chest", "stomach", "back"]
+))
+_PATTERN_KEY_MATCHER = TermMatcher.from_terms(PATTERN_KEY_TERMS)
+
+# Most recent scores kept per learned pattern
+MAX_SCORES_PER_PATTERN = 32
+
+@dataclass(slots=True)
+class PatternStats:
+    """What has been learned for one pattern key"""
+    # Responses are counted by digest rather than kept whole; scores are
+    # bounded so a busy pattern keeps only its most recent ones
+    response_digests: Counter = field(default_factory=Counter)
+    satisfaction_scores: deque = field(default_factory=lambda: deque(maxlen=MAX_SCORES_PER_PATTERN))
+    usage_count: int = 0
+
+def _digest_default(value: Any) -> Any:
+    """JSON stand-in for values json cannot encode: mappings (frozen ones included) as dicts, others by repr"""
+    return dict(value) if isinstance(value, Mapping) else repr(value)
+
+def _response_digest(response: Dict[str, Any]) -> bytes:
+    """Short digest identifying a response by content; accepts any response, never raises"""
+    try:
+        canonical = json.dumps(response, sort_keys=True, default=_digest_default, ensure_ascii=False)
+    except (TypeError, ValueError):
+        # Keys that do not sort against each other (e.g. str and int) or a
+        # reference cycle; repr still identifies the content
+        canonical = repr(response)
+    return hashlib.blake2b(canonical.encode("utf-8", "surrogatepass"), digest_size=8).digest()
+
+class EDMedicalKnowledge:
+    """Emergency Department Medical Knowledge System with Learning Capabilities"""
+    
+    def __init__(self):
+        # Shared, read-only module data; an instance only owns its learning state
+        self.knowledge_base = KNOWLEDGE_BASE
+        self.triage_system = TRIAGE_SYSTEM
+        self._terms = _TERM_INDEX
+        self._investigations = _RECOMMENDED_INVESTIGATIONS
+        self._diagnoses = _PROVISIONAL_DIAGNOSES
+        self._default_diagnoses = _DEFAULT_DIAGNOSES
+        self.learning_patterns: Dict[str, PatternStats] = {}  # Store successful response patterns
+        # Running totals over every stored satisfaction score
+        self._score_sum = 0
+        self._score_count = 0
+        # Per instance, so a subclass with its own knowledge keeps its own results
+        self._analyze_cached = lru_cache(maxsize=4096)(self._analyze)
     
     def analyze_symptoms(self, user_input: str, user_context: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Analyze symptoms using comprehensive medical knowledge"""
-        user_input_lower = user_input.lower()
-        
+        """
+        Analyze symptoms using comprehensive medical knowledge
+        The analysis depends only on the lowercased input (not user_context), so it
+        is cached on that and returned read-only
+        """
+        return self._analyze_cached(user_input.lower())
+    
+    def analyze_symptoms_batch(self, user_inputs: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze many inputs at once (e.g. bulk intake), one result per input as
+        analyze_symptoms would return it
+        All inputs are scanned together and repeated inputs share one analysis
+        """
+        inputs_lower = [user_input.lower() for user_input in user_inputs]
+        analyses = {}
+        results = []
+        for user_input_lower, term_mask in zip(inputs_lower, self._terms.matcher.scan_many(inputs_lower)):
+            if user_input_lower not in analyses:
+                analyses[user_input_lower] = self._analysis(user_input_lower, term_mask)
+            results.append(analyses[user_input_lower])
+        return results
+    
+    def _analyze(self, user_input_lower: str) -> Dict[str, Any]:
+        """Frozen analysis of lowercased input"""
+        # One scan finds every keyword the steps below look for
+        return self._analysis(user_input_lower, self._terms.matcher.scan(user_input_lower))
+    
+    def _analysis(self, user_input_lower: str, term_mask: int) -> Dict[str, Any]:
+        """Frozen analysis of lowercased input, given the bits of the keywords found in it"""
         # Identify primary symptom category
-        symptom_category = self._identify_symptom_category(user_input_lower)
+        symptom_category = self._identify_symptom_category(term_mask)
         
         if not symptom_category:
-            return self._general_medical_response(user_input, user_context)
+            return freeze(self._general_medical_response(user_input_lower, None))
         
         # Get relevant knowledge for the symptom
         knowledge = self.knowledge_base.get(symptom_category, {})
         
         # Assess triage level based on red flags
-        triage_level = self._assess_triage_level(user_input_lower, knowledge)
+        triage_level = self._assess_triage_level(term_mask, symptom_category)
         
         # Generate follow-up questions
         follow_up_questions = self._select_follow_up_questions(user_input_lower, knowledge)
         
         # Get provisional diagnoses
-        provisional_diagnoses = self._get_provisional_diagnoses(user_input_lower, knowledge)
+        provisional_diagnoses = self._get_provisional_diagnoses(term_mask, symptom_category, knowledge)
         
         # Recommend investigations
-        investigations = self._recommend_investigations(knowledge, triage_level)
+        investigations = self._recommend_investigations(symptom_category, triage_level)
         
-        # Generate comprehensive response
-        return {
+        # Generate comprehensive response; every part is already frozen
+        return MappingProxyType({
             "primary_symptom": symptom_category,
             "triage_level": triage_level,
             "triage_description": self.triage_system[triage_level]["description"],
@@ -247,102 +438,64 @@ class EDMedicalKnowledge:
             "universal_actions": self.triage_system[triage_level]["universal_actions"],
             "emergency_detected": triage_level in ["RED", "ORANGE"],
             "requires_immediate_care": triage_level == "RED"
-        }
+        })
     
-    def _identify_symptom_category(self, user_input: str) -> str:
+    def _identify_symptom_category(self, term_mask: int) -> str:
         """Identify the primary symptom category"""
-        symptom_patterns = {
-            "fever": ["fever", "temperature", "hot", "chills", "rigors", "night sweats"],
-            "chest_pain": ["chest pain", "chest hurt", "heart pain", "chest pressure", "chest tightness"],
-            "shortness_of_breath": ["shortness of breath", "short of breath", "difficulty breathing", "can't breathe", "breathing problems", "dyspnea"],
-            "abdominal_pain": ["stomach pain", "abdominal pain", "belly pain", "stomach ache", "abdominal cramps"],
-            "headache": ["headache", "head pain", "migraine", "head hurts", "skull pain"]
-        }
-        
-        for category, patterns in symptom_patterns.items():
-            if any(pattern in user_input for pattern in patterns):
+        for category, category_mask in self._terms.category_masks:
+            if term_mask & category_mask:
                 return category
         
         return None
     
-    def _assess_triage_level(self, user_input: str, knowledge: Dict[str, Any]) -> str:
+    def _assess_triage_level(self, term_mask: int, symptom_category: str) -> str:
         """Assess triage level based on red flags and severity indicators"""
-        red_flags = knowledge.get("red_flags", [])
-        
         # Check for RED flag keywords
-        for flag in red_flags:
-            if flag.lower() in user_input:
-                return "RED"
+        if term_mask & self._terms.red_flag_masks.get(symptom_category, 0):
+            return "RED"
         
         # Check for severity indicators
-        severe_indicators = ["severe", "worst ever", "crushing", "sudden", "can't breathe", "unbearable"]
-        moderate_indicators = ["moderate", "significant", "concerning", "worsening"]
-        
-        if any(indicator in user_input for indicator in severe_indicators):
+        if term_mask & self._terms.severe_mask:
             return "ORANGE"
-        elif any(indicator in user_input for indicator in moderate_indicators):
+        elif term_mask & self._terms.moderate_mask:
             return "YELLOW"
         
         return "GREEN"
     
     def _select_follow_up_questions(self, user_input: str, knowledge: Dict[str, Any]) -> List[str]:
         """Select appropriate follow-up questions based on symptom"""
-        questions = knowledge.get("follow_up_questions", [])
+        questions = knowledge.get("follow_up_questions", ())
         
         # Return first 2-3 most relevant questions
         return questions[:3]
     
-    def _get_provisional_diagnoses(self, user_input: str, knowledge: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Get provisional diagnoses based on symptom patterns"""
+    def _get_provisional_diagnoses(self, term_mask: int, symptom_category: str, knowledge: Dict[str, Any]) -> Tuple[Mapping, ...]:
+        """Get provisional diagnoses based on symptom patterns (prebuilt, read-only entries)"""
         diagnoses_data = knowledge.get("provisional_diagnoses", {})
         
-        if isinstance(diagnoses_data, dict):
+        if isinstance(diagnoses_data, Mapping):
             # Find matching pattern
-            for pattern, diagnoses in diagnoses_data.items():
-                if self._matches_pattern(user_input, pattern):
-                    return [{"diagnosis": dx, "likelihood": "Consider based on presentation"} for dx in diagnoses[:3]]
+            group_masks = self._terms.diagnosis_group_masks[symptom_category]
+            by_pattern = self._diagnoses[symptom_category]
+            for pattern in diagnoses_data:
+                if self._matches_pattern(term_mask, group_masks[pattern]):
+                    return by_pattern[pattern]
             
             # Default to first category if no specific match
-            first_category = list(diagnoses_data.values())[0] if diagnoses_data else []
-            return [{"diagnosis": dx, "likelihood": "Consider based on presentation"} for dx in first_category[:3]]
+            return self._default_diagnoses[symptom_category]
         
-        elif isinstance(diagnoses_data, list):
-            return [{"diagnosis": dx, "likelihood": "Consider based on presentation"} for dx in diagnoses_data[:3]]
+        elif isinstance(diagnoses_data, (list, tuple)):
+            return self._diagnoses[symptom_category]
         
-        return []
+        return ()
     
-    def _matches_pattern(self, user_input: str, pattern: str) -> bool:
-        """Check if user input matches a diagnostic pattern"""
-        pattern_keywords = pattern.replace("_", " ").split("/")
-        
-        for keyword_group in pattern_keywords:
-            keywords = keyword_group.strip().split()
-            if all(keyword in user_input for keyword in keywords):
-                return True
-        
-        return False
+    def _matches_pattern(self, term_mask: int, group_masks: Tuple[int, ...]) -> bool:
+        """Check if user input matches a diagnostic pattern (all keywords of any one group present)"""
+        return any(term_mask & group_mask == group_mask for group_mask in group_masks)
     
-    def _recommend_investigations(self, knowledge: Dict[str, Any], triage_level: str) -> Dict[str, List[str]]:
+    def _recommend_investigations(self, symptom_category: str, triage_level: str) -> Dict[str, List[str]]:
         """Recommend investigations based on symptom and triage level"""
-        investigations = knowledge.get("investigations", {})
-        
-        if triage_level in ["RED", "ORANGE"]:
-            # Include all investigations for high-acuity patients
-            return investigations
-        elif triage_level == "YELLOW":
-            # Focus on essential investigations
-            return {
-                "bedside": investigations.get("bedside", [])[:2],
-                "labs": investigations.get("labs", [])[:3],
-                "imaging": investigations.get("imaging", [])[:1]
-            }
-        else:  # GREEN
-            # Minimal investigations
-            return {
-                "bedside": investigations.get("bedside", [])[:1],
-                "labs": ["Basic metabolic panel as indicated"],
-                "imaging": ["As clinically indicated"]
-            }
+        return self._investigations[symptom_category][triage_level]
     
     def _general_medical_response(self, user_input: str, user_context: Dict[str, Any]) -> Dict[str, Any]:
         """Generate general medical response for unspecified symptoms"""
@@ -374,54 +527,43 @@ class EDMedicalKnowledge:
         if satisfaction_score >= 4:  # Store patterns with high satisfaction
             pattern_key = self._generate_pattern_key(user_input)
             
-            if pattern_key not in self.learning_patterns:
-                self.learning_patterns[pattern_key] = {
-                    "successful_responses": [],
-                    "satisfaction_scores": [],
-                    "usage_count": 0
-                }
+            stats = self.learning_patterns.get(pattern_key)
+            if stats is None:
+                stats = self.learning_patterns[pattern_key] = PatternStats()
             
-            self.learning_patterns[pattern_key]["successful_responses"].append(response)
-            self.learning_patterns[pattern_key]["satisfaction_scores"].append(satisfaction_score)
-            self.learning_patterns[pattern_key]["usage_count"] += 1
+            stats.response_digests[_response_digest(response)] += 1
+            stats.satisfaction_scores.append(satisfaction_score)
+            stats.usage_count += 1
+            self._score_sum += satisfaction_score
+            self._score_count += 1
     
     def _generate_pattern_key(self, user_input: str) -> str:
         """Generate a pattern key for learning storage"""
-        # Extract key medical terms and create a normalized pattern
-        medical_terms = []
-        symptom_keywords = ["pain", "fever", "headache", "nausea", "dizzy", "shortness", "breathing", "chest", "stomach", "back"]
+        # Extract key medical terms (one scan; bits are in sorted term order) and create a normalized pattern
+        mask = _PATTERN_KEY_MATCHER.scan(user_input.lower())
+        medical_terms = [term for i, term in enumerate(PATTERN_KEY_TERMS) if mask >> i & 1]
         
-        user_lower = user_input.lower()
-        for term in symptom_keywords:
-            if term in user_lower:
-                medical_terms.append(term)
-        
-        return "_".join(sorted(medical_terms)) if medical_terms else "general_query"
+        return "_".join(medical_terms) if medical_terms else "general_query"
     
     def get_learning_insights(self) -> Dict[str, Any]:
         """Get insights from the learning system"""
         total_patterns = len(self.learning_patterns)
-        most_common_patterns = sorted(
+        # Top five only; nlargest keeps ties in insertion order, as a stable sort would
+        most_common_patterns = nlargest(
+            5,
             self.learning_patterns.items(),
-            key=lambda x: x[1]["usage_count"],
-            reverse=True
-        )[:5]
-        
-        avg_satisfaction = 0
-        total_responses = 0
-        for pattern_data in self.learning_patterns.values():
-            scores = pattern_data["satisfaction_scores"]
-            total_responses += len(scores)
-            avg_satisfaction += sum(scores)
+            key=lambda x: x[1].usage_count
+        )
         
-        avg_satisfaction = avg_satisfaction / total_responses if total_responses > 0 else 0
+        total_responses = self._score_count
+        avg_satisfaction = self._score_sum / total_responses if total_responses > 0 else 0
         
         return {
             "total_learned_patterns": total_patterns,
             "total_responses_evaluated": total_responses,
             "average_satisfaction": round(avg_satisfaction, 2),
             "most_common_patterns": [
-                {"pattern": pattern, "usage_count": data["usage_count"]}
-                for pattern, data in most_common_patterns
+                {"pattern": pattern, "usage_count": stats.usage_count}
+                for pattern, stats in most_common_patterns
             ]
         }
\ No newline at end of file
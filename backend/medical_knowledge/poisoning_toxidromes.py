@@ -4,6 +4,10 @@ Based on emergency toxicology protocols for rapid identification and treatment
 Covers common toxidromes and their specific antidotes/treatments
 """
 
+from functools import lru_cache
+
+from medical_knowledge._matcher import TermMatcher
+
 POISONING_TOXIDROMES_KNOWLEDGE = {
     "immediate_stabilization": [
         "Assess ABCs (Airway, Breathing, Circulation)",
@@ -306,6 +310,90 @@ POISONING_TOXIDROMES_KNOWLEDGE = {
     ]
 }
 
+# Toxidromes as (key, clinical features, causative drugs, feature weight, drug
+# weight), in scoring order; clues match as substrings of the lowercased
+# description. A toxidrome scores its feature weight if any feature occurs plus
+# its drug weight if any drug does, and is reported when the score exceeds 0.2.
+_TOXIDROME_RULES = (
+    ("sympathomimetic",
+     frozenset({"agitated", "restless", "sweating", "hot", "dilated pupils", "fast heart"}),
+     frozenset({"cocaine", "amphetamine", "meth", "adderall", "caffeine", "energy drink"}),
+     0.3, 0.6),
+    ("anticholinergic",
+     frozenset({"dry", "hot", "red", "confused", "dilated pupils", "no sweating"}),
+     frozenset({"benadryl", "antihistamine", "tricyclic", "atropine"}),
+     0.3, 0.6),
+    ("opioid",
+     frozenset({"sleepy", "slow breathing", "pinpoint pupils", "nodding off"}),
+     frozenset({"heroin", "oxycodone", "fentanyl", "morphine", "codeine", "pills"}),
+     0.4, 0.6),
+    ("cholinergic_muscarinic",
+     frozenset({"salivation", "sweating", "small pupils", "diarrhea", "muscle twitching"}),
+     frozenset({"organophosphate", "pesticide", "nerve agent"}),
+     0.4, 0.7),
+    ("sedative_hypnotic",
+     frozenset({"sleepy", "slow", "depressed", "confused", "alcohol", "drunk"}),
+     frozenset({"alcohol", "benzodiazepine", "xanax", "valium", "barbiturate"}),
+     0.3, 0.6)
+)
+
+# Index-aligned with _TOXIDROME_RULES: how each toxidrome is reported in the differential
+_TOXIDROME_NAMES = tuple(
+    POISONING_TOXIDROMES_KNOWLEDGE["toxidromes"].get(key, {}).get("name", key.replace("_", " ").title())
+    for key, *_ in _TOXIDROME_RULES
+)
+_TOXIDROME_DESCRIPTIONS = tuple(
+    f"Clinical presentation consistent with {key} toxidrome" for key, *_ in _TOXIDROME_RULES
+)
+_TOXIDROME_RATIONALES = tuple(
+    f"Symptoms and/or drug exposure history suggests {key} poisoning" for key, *_ in _TOXIDROME_RULES
+)
+
+# Antidotes recommended when a toxidrome is in the differential
+_ANTIDOTES_BY_TOXIDROME = {
+    "opioid": ("Naloxone (Narcan)",),
+    "anticholinergic": ("Physostigmine (if pure anticholinergic)",),
+    "cholinergic_muscarinic": ("Atropine", "Pralidoxime (for organophosphates)")
+}
+
+def _clue_masks():
+    """
+    (clue, mask) pairs for every rule's clues
+    Bit 2i stands for rule i's features and bit 2i + 1 for its drugs
+    """
+    for i, (_, keywords, drugs, _, _) in enumerate(_TOXIDROME_RULES):
+        for keyword in keywords:
+            yield keyword, 1 << 2 * i
+        for drug in drugs:
+            yield drug, 1 << 2 * i + 1
+
+_CLUE_MATCHER = TermMatcher(_clue_masks())
+
+@lru_cache(maxsize=512)
+def _score_text(symptom_text: str) -> tuple:
+    """
+    Top three (rule index, score) pairs for a lowercased description, highest
+    first; empty when no toxidrome scored. Cached, so repeated descriptions skip
+    the scan
+    """
+    # Check for specific toxin mentions
+    toxin_scores = {}
+    
+    # One scan finds every rule's clues; each rule then reads its two low bits
+    clue_mask = _CLUE_MATCHER.scan(symptom_text)
+    for index, (_, _, _, keyword_weight, drug_weight) in enumerate(_TOXIDROME_RULES):
+        score = 0
+        if clue_mask & 1:
+            score += keyword_weight
+        if clue_mask & 2:
+            score += drug_weight
+        clue_mask >>= 2
+        
+        if score > 0.2:
+            toxin_scores[index] = score
+    
+    return tuple(sorted(toxin_scores.items(), key=lambda x: x[1], reverse=True)[:3])
+
 def analyze_poisoning_symptoms(symptoms: dict, patient_factors: dict) -> dict:
     """
     Analyze symptoms for toxidrome identification using systematic approach
@@ -319,98 +407,21 @@ def analyze_poisoning_symptoms(symptoms: dict, patient_factors: dict) -> dict:
         "differential_diagnosis": []
     }
     
-    symptom_text = symptoms.get("description", "").lower()
-    
-    # Check for specific toxin mentions
-    toxin_scores = {}
-    
-    # Sympathomimetic toxidrome
-    symp_keywords = ["agitated", "restless", "sweating", "hot", "dilated pupils", "fast heart"]
-    symp_drugs = ["cocaine", "amphetamine", "meth", "adderall", "caffeine", "energy drink"]
-    
-    symp_score = 0
-    if any(keyword in symptom_text for keyword in symp_keywords):
-        symp_score += 0.3
-    if any(drug in symptom_text for drug in symp_drugs):
-        symp_score += 0.6
-        
-    if symp_score > 0.2:
-        toxin_scores["sympathomimetic"] = symp_score
-    
-    # Anticholinergic toxidrome  
-    anti_keywords = ["dry", "hot", "red", "confused", "dilated pupils", "no sweating"]
-    anti_drugs = ["benadryl", "antihistamine", "tricyclic", "atropine"]
-    
-    anti_score = 0
-    if any(keyword in symptom_text for keyword in anti_keywords):
-        anti_score += 0.3
-    if any(drug in symptom_text for drug in anti_drugs):
-        anti_score += 0.6
-        
-    if anti_score > 0.2:
-        toxin_scores["anticholinergic"] = anti_score
-    
-    # Opioid toxidrome
-    opioid_keywords = ["sleepy", "slow breathing", "pinpoint pupils", "nodding off"]
-    opioid_drugs = ["heroin", "oxycodone", "fentanyl", "morphine", "codeine", "pills"]
-    
-    opioid_score = 0
-    if any(keyword in symptom_text for keyword in opioid_keywords):
-        opioid_score += 0.4
-    if any(drug in symptom_text for drug in opioid_drugs):
-        opioid_score += 0.6
-        
-    if opioid_score > 0.2:
-        toxin_scores["opioid"] = opioid_score
-    
-    # Cholinergic toxidrome
-    cholin_keywords = ["salivation", "sweating", "small pupils", "diarrhea", "muscle twitching"]
-    cholin_drugs = ["organophosphate", "pesticide", "nerve agent"]
-    
-    cholin_score = 0
-    if any(keyword in symptom_text for keyword in cholin_keywords):
-        cholin_score += 0.4
-    if any(drug in symptom_text for drug in cholin_drugs):
-        cholin_score += 0.7
-        
-    if cholin_score > 0.2:
-        toxin_scores["cholinergic_muscarinic"] = cholin_score
-    
-    # Sedative hypnotic toxidrome
-    sedative_keywords = ["sleepy", "slow", "depressed", "confused", "alcohol", "drunk"]
-    sedative_drugs = ["alcohol", "benzodiazepine", "xanax", "valium", "barbiturate"]
-    
-    sedative_score = 0
-    if any(keyword in symptom_text for keyword in sedative_keywords):
-        sedative_score += 0.3
-    if any(drug in symptom_text for drug in sedative_drugs):
-        sedative_score += 0.6
-        
-    if sedative_score > 0.2:
-        toxin_scores["sedative_hypnotic"] = sedative_score
+    top_toxidromes = _score_text(symptoms.get("description", "").lower())
     
     # Generate toxidrome assessment
-    if toxin_scores:
-        sorted_toxidromes = sorted(toxin_scores.items(), key=lambda x: x[1], reverse=True)
-        
-        for toxidrome_key, likelihood in sorted_toxidromes[:3]:
-            toxidrome_data = POISONING_TOXIDROMES_KNOWLEDGE["toxidromes"].get(toxidrome_key, {})
-            
+    if top_toxidromes:
+        for index, likelihood in top_toxidromes:
             assessment["differential_diagnosis"].append({
-                "condition": toxidrome_data.get("name", toxidrome_key.replace("_", " ").title()),
+                "condition": _TOXIDROME_NAMES[index],
                 "likelihood": int(likelihood * 100),
-                "description": f"Clinical presentation consistent with {toxidrome_key} toxidrome",
-                "rationale": f"Symptoms and/or drug exposure history suggests {toxidrome_key} poisoning",
+                "description": _TOXIDROME_DESCRIPTIONS[index],
+                "rationale": _TOXIDROME_RATIONALES[index],
                 "urgency": "EMERGENCY"
             })
             
             # Add relevant antidotes
-            if toxidrome_key == "opioid":
-                assessment["antidotes"].append("Naloxone (Narcan)")
-            elif toxidrome_key == "anticholinergic":
-                assessment["antidotes"].append("Physostigmine (if pure anticholinergic)")
-            elif toxidrome_key == "cholinergic_muscarinic":
-                assessment["antidotes"].extend(["Atropine", "Pralidoxime (for organophosphates)"])
+            assessment["antidotes"].extend(_ANTIDOTES_BY_TOXIDROME.get(_TOXIDROME_RULES[index][0], ()))
     else:
         # If no clear toxidrome identified
         assessment["differential_diagnosis"] = [{
@@ -11,10 +11,10 @@ from dotenv import load_dotenv
 import sys
 sys.path.append('/app/backend')
 from medical_knowledge.chest_pain import analyze_chest_pain_symptoms, CHEST_PAIN_KNOWLEDGE
-from medical_knowledge.altered_mental_status import analyze_altered_mental_status, ALTERED_MENTAL_STATUS_KNOWLEDGE
+from medical_knowledge.altered_mental_status import analyze_altered_mental_status, AMSInput, ALTERED_MENTAL_STATUS_KNOWLEDGE
 from medical_knowledge.poisoning_toxidromes import analyze_poisoning_symptoms, POISONING_TOXIDROMES_KNOWLEDGE
 from medical_knowledge.trauma_emergency import analyze_trauma_presentation, analyze_cardiac_arrest, TRAUMA_EMERGENCY_KNOWLEDGE
-from medical_knowledge.clinical_history_framework import generate_natural_followup, get_system_specific_questions, CLINICAL_HISTORY_FRAMEWORK
+from medical_knowledge.clinical_history_framework import generate_natural_followup, get_system_specific_questions
 from medical_knowledge.emergency_department_handbook import EDMedicalKnowledge
 
 # Load environment variables
@@ -571,17 +571,12 @@ async def generate_medical_assessment(request: dict):
                 ["confused", "disoriented", "altered mental status", "not making sense", 
                  "acting strange", "agitated", "lethargic", "delirious"]):
             
-            patient_factors = {
-                "medical_history": state.get("pastMedicalHistory", []),
-                "medications": state.get("medications", []),
-                "age": state.get("age", 0)
-            }
-            
             # Use AMS knowledge base
-            clinical_assessment = analyze_altered_mental_status(
-                {"description": chief_complaint + " " + str(state.get("associatedSymptoms", []))},
-                patient_factors
-            )
+            clinical_assessment = analyze_altered_mental_status(AMSInput(
+                description_lc=(chief_complaint + " " + str(state.get("associatedSymptoms", []))).lower(),
+                age=state.get("age", 0),
+                medical_history_lc=str(state.get("pastMedicalHistory", [])).lower()
+            ))
             
             return {
                 "summary": f"Patient presents with altered mental status: {chief_complaint}. This requires systematic evaluation using AEIOU TIPS approach.",
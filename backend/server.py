@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import gc
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
@@ -147,6 +148,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def freeze_static_objects():
+    # Everything allocated during import (routers, frozen knowledge bases) lives
+    # for the whole process; keep it out of the cyclic GC's generations
+    gc.freeze()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
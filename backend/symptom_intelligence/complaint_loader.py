@@ -0,0 +1,57 @@
+# complaint_loader.py
+# Loading of the complaint knowledge files (hand-edited per-complaint JSON plus
+# the bundle written by generate_complaints.py); no database access
+
+import json
+import os
+from typing import Dict, Any, Optional
+
+from diagnosis_engine._fast import json_loads
+
+# Runtime complaints directory; generate_complaints.py writes its bundle here too
+COMPLAINTS_DIR = os.path.join(os.path.dirname(__file__), "complaints")
+
+# Generated complaints bundle (see generate_complaints.py). The loose per-complaint
+# files are hand-edited and take precedence; the bundle only fills the gaps
+COMPLAINTS_BUNDLE = "complaints.json"
+
+def _add_complaint(complaints: Dict[str, Any], data: Dict[str, Any]):
+    """Register a complaint definition under its lowercased chief complaint"""
+    chief_complaint = data.get("chief_complaint", "").lower()
+    if chief_complaint:
+        complaints[chief_complaint] = data
+        print(f"✅ Loaded complaint: {chief_complaint}")
+
+def load_complaints(complaints_path: Optional[str] = None) -> Dict[str, Any]:
+    """Load the per-complaint JSON files plus any bundled complaints they do not cover"""
+    complaints_path = complaints_path or COMPLAINTS_DIR
+    complaints = {}
+
+    if not os.path.exists(complaints_path):
+        print(f"⚠️ Complaints directory not found: {complaints_path}")
+        return complaints
+
+    for file in os.listdir(complaints_path):
+        if file.endswith(".json") and file != COMPLAINTS_BUNDLE:
+            try:
+                with open(os.path.join(complaints_path, file), "r", encoding="utf-8") as f:
+                    _add_complaint(complaints, json.load(f))
+            except Exception as e:
+                print(f"❌ Error loading {file}: {e}")
+
+    bundle_path = os.path.join(complaints_path, COMPLAINTS_BUNDLE)
+    if os.path.exists(bundle_path):
+        try:
+            with open(bundle_path, "rb") as f:
+                bundle = json_loads(f.read())
+            for data in bundle.get("complaints", {}).values():
+                chief_complaint = data.get("chief_complaint", "").lower()
+                if chief_complaint in complaints:
+                    print(f"⚠️ Skipping bundled {chief_complaint}: a per-complaint file defines it")
+                    continue
+                _add_complaint(complaints, data)
+        except Exception as e:
+            print(f"❌ Error loading {COMPLAINTS_BUNDLE}: {e}")
+
+    print(f"📊 Total complaints loaded: {len(complaints)}")
+    return complaints
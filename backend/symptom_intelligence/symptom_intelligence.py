@@ -3,11 +3,21 @@
 
 from datetime import datetime, timezone
 from pymongo import MongoClient
-import json
 import os
 import uuid
 from typing import Dict, List, Optional, Any
 
+from symptom_intelligence.complaint_loader import load_complaints
+from symptom_intelligence.triage_rules import (
+    compile_all_triage_functions,
+    compile_all_triage_preludes,
+    compile_all_triage_rules,
+    evaluate_triage_rule,
+    normalize_slots,
+    run_triage_prelude
+)
+from symptom_intelligence.urgency import Urgency, urgency_of
+
 # ==========================================================
 # 🔹 MongoDB Setup
 # ==========================================================
@@ -24,31 +34,10 @@ interactions_log = db["interactions_log"]  # For ML training data
 # ==========================================================
 # 🔸 Load All Complaint Knowledge Files
 # ==========================================================
-def load_complaints() -> Dict[str, Any]:
-    """Load all complaint JSON files from complaints directory"""
-    complaints_path = os.path.join(os.path.dirname(__file__), "complaints")
-    complaints = {}
-    
-    if not os.path.exists(complaints_path):
-        print(f"⚠️ Complaints directory not found: {complaints_path}")
-        return complaints
-    
-    for file in os.listdir(complaints_path):
-        if file.endswith(".json"):
-            try:
-                with open(os.path.join(complaints_path, file), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    chief_complaint = data.get("chief_complaint", "").lower()
-                    if chief_complaint:
-                        complaints[chief_complaint] = data
-                        print(f"✅ Loaded complaint: {chief_complaint}")
-            except Exception as e:
-                print(f"❌ Error loading {file}: {e}")
-    
-    print(f"📊 Total complaints loaded: {len(complaints)}")
-    return complaints
-
 complaint_data = load_complaints()
+compiled_triage_rules = compile_all_triage_rules(complaint_data)
+compiled_triage_preludes = compile_all_triage_preludes(complaint_data)
+compiled_triage_functions = compile_all_triage_functions(complaint_data)
 
 # ==========================================================
 # 🧠 Session Management
@@ -157,27 +146,6 @@ def get_next_question(session_id: str) -> Optional[Dict[str, str]]:
 # ==========================================================
 # 🚦 Completion & Triage Logic
 # ==========================================================
-def evaluate_triage_rule(rule: Dict[str, Any], collected: Dict[str, Any]) -> bool:
-    """Evaluate a single triage rule against collected data"""
-    try:
-        expression = rule.get("expression", "False")
-        # Safe evaluation with collected slots as context
-        # Provide safe built-ins for evaluation
-        safe_builtins = {
-            "str": str,
-            "int": int,
-            "float": float,
-            "bool": bool,
-            "len": len,
-            "min": min,
-            "max": max
-        }
-        result = eval(expression, {"__builtins__": safe_builtins}, collected)
-        return bool(result)
-    except Exception as e:
-        print(f"⚠️ Error evaluating rule '{expression[:50]}...': {e}")
-        return False
-
 def check_completion_and_triage(session_id: str) -> Dict[str, Any]:
     """Check if session has enough data and determine triage level"""
     s = get_session(session_id)
@@ -190,21 +158,41 @@ def check_completion_and_triage(session_id: str) -> Dict[str, Any]:
     
     # Evaluate triage rules FIRST (even if completion threshold not met)
     triage = "🟨 Yellow"  # default
+    triage_urgency = Urgency.YELLOW
     triage_reason = "Routine care recommended"
     
-    for rule in data.get("triage_rules", []):
-        if evaluate_triage_rule(rule, collected):
-            triage = rule.get("level", "🟨 Yellow")
-            triage_reason = rule.get("reason", "Triage rule matched")
-            print(f"✅ Triage rule matched: {triage} - {triage_reason}")
-            break
+    rules = data.get("triage_rules", [])
+    slot_values = normalize_slots(collected, data.get("normalized_slots", []))
+    slot_values = run_triage_prelude(compiled_triage_preludes.get(cc, []), slot_values)
+    matched = None
+    triage_fn = compiled_triage_functions.get(cc)
+    if triage_fn is not None:
+        try:
+            matched = triage_fn(slot_values)
+        except Exception as e:
+            print(f"⚠️ Triage function failed for {cc}, evaluating rules one by one: {e}")
+            triage_fn = None
+    if triage_fn is None:
+        compiled_rules = compiled_triage_rules.get(cc, [])
+        for i, rule in enumerate(rules):
+            compiled = compiled_rules[i] if i < len(compiled_rules) else None
+            if compiled is not None and evaluate_triage_rule(rule, slot_values, compiled):
+                matched = i
+                break
+    
+    if matched is not None:
+        rule = rules[matched]
+        triage = rule.get("level", "🟨 Yellow")
+        triage_urgency = Urgency(rule["level_value"]) if "level_value" in rule else urgency_of(triage)
+        triage_reason = rule.get("reason", "Triage rule matched")
+        print(f"✅ Triage rule matched: {triage} - {triage_reason}")
     
     # Check completion threshold
     threshold = data.get("completion_threshold", 3)
     if len(collected) < threshold:
         print(f"ℹ️ Session {session_id}: {len(collected)}/{threshold} slots filled")
         # If we have an emergency triage, complete anyway
-        if triage in ["🟥 Red", "🟧 Orange"]:
+        if triage_urgency >= Urgency.ORANGE:
             print(f"🚨 Emergency triage detected ({triage}) - completing despite incomplete slots")
         else:
             return {
@@ -0,0 +1,160 @@
+# triage_rules.py
+# Compilation and evaluation of complaint triage rules (expressions, preludes and
+# the generated per-complaint `_triage` functions); no database access
+
+import hashlib
+import json
+from typing import Dict, List, Any
+
+# Builtins available to triage rule expressions
+SAFE_BUILTINS = {
+    "str": str,
+    "int": int,
+    "float": float,
+    "bool": bool,
+    "len": len,
+    "min": min,
+    "max": max
+}
+
+# Number parsing shared by rule expressions. Both read only the first
+# whitespace-separated token and raise if it is not a number, so a rule on an
+# unparseable value (e.g. "about 5") fails rather than firing
+def _numf(value: Any) -> float:
+    """First token of a slot value as a float, with f/c/° unit marks removed, e.g. "102.5f" -> 102.5"""
+    return float(str(value).replace('f', '').replace('c', '').replace('°', '').split()[0])
+
+def _intf(value: Any) -> int:
+    """First token of a slot value as an int, e.g. "5 minutes" -> 5 (0 if the value is blank)"""
+    tokens = str(value).split()
+    return int(tokens[0] if tokens else '0')
+
+# Helpers referenced by generated rule expressions (listed per complaint under "helpers")
+RULE_HELPERS = {
+    "_numf": _numf,
+    "_intf": _intf
+}
+
+def compile_triage_rule(rule: Dict[str, Any], label: str):
+    """Return (code, slot_names) for a rule, compiled from its expression"""
+    code = compile(rule.get("expression", "False"), label, "eval")
+    # co_names also lists attributes like "lower"; they never collide with slot keys
+    slot_names = tuple(rule.get("slots_referenced") or code.co_names)
+    return code, slot_names
+
+def compile_all_triage_rules(complaints: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Compile every complaint's triage rules once, keyed by chief complaint"""
+    compiled = {}
+    for cc, data in complaints.items():
+        missing = set(data.get("helpers", [])) - RULE_HELPERS.keys()
+        if missing:
+            print(f"⚠️ {cc} rules reference unknown helpers: {sorted(missing)}")
+        rules = []
+        for i, rule in enumerate(data.get("triage_rules", [])):
+            try:
+                rules.append(compile_triage_rule(rule, f"<{cc}:{i}>"))
+            except SyntaxError as e:
+                print(f"❌ Error compiling triage rule {i} for {cc}: {e}")
+                rules.append(None)
+        compiled[cc] = rules
+    return compiled
+
+def compile_all_triage_preludes(complaints: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Compile each complaint's prelude statements (shared slot conversions), keyed by chief complaint"""
+    preludes = {}
+    for cc, data in complaints.items():
+        statements = []
+        for i, statement in enumerate(data.get("prelude", [])):
+            try:
+                statements.append(compile(statement, f"<{cc}:prelude:{i}>", "exec"))
+            except SyntaxError as e:
+                print(f"❌ Error compiling prelude statement {i} for {cc}: {e}")
+        if statements:
+            preludes[cc] = statements
+    return preludes
+
+class _Missing:
+    """Stand-in for an uncollected slot in generated triage functions.
+
+    Any use raises NameError, so a rule touching it fails exactly as the
+    per-rule eval does when the slot is absent from its namespace.
+    """
+    def _missing(self, *args):
+        raise NameError("slot not collected")
+    
+    __bool__ = __str__ = __int__ = __float__ = __index__ = _missing
+    __contains__ = __iter__ = __len__ = _missing
+    __eq__ = __ne__ = __lt__ = __le__ = __gt__ = __ge__ = _missing
+    __hash__ = object.__hash__
+    
+    def __getattr__(self, name):
+        self._missing()
+
+_MISSING = _Missing()
+
+def triage_rules_digest(complaint: Dict[str, Any]) -> str:
+    """SHA-256 of a complaint's prelude statements and rule expressions, in order"""
+    sources = {
+        "prelude": list(complaint.get("prelude", [])),
+        "expressions": [rule.get("expression", "False") for rule in complaint.get("triage_rules", [])]
+    }
+    return hashlib.sha256(json.dumps(sources, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def compile_all_triage_functions(complaints: Dict[str, Any]) -> Dict[str, Any]:
+    """Build each complaint's generated `_triage(slots)` function, keyed by chief complaint.
+    
+    A function is only used while the rules it was generated from are unchanged
+    (its stored digest matches); after a hand edit the rules are evaluated one by one.
+    """
+    functions = {}
+    for cc, data in complaints.items():
+        source = data.get("compiled_fn_src")
+        if not source:
+            continue
+        if data.get("compiled_fn_digest") != triage_rules_digest(data):
+            print(f"⚠️ Triage rules for {cc} changed since generation, evaluating them one by one")
+            continue
+        scope = {"__builtins__": SAFE_BUILTINS, **RULE_HELPERS, "_MISSING": _MISSING, "Exception": Exception}
+        try:
+            exec(compile(source, f"<{cc}:triage>", "exec"), scope)
+            functions[cc] = scope["_triage"]
+        except Exception as e:
+            print(f"⚠️ Falling back to per-rule triage for {cc}: {e}")
+    return functions
+
+def normalize_slots(collected: Dict[str, Any], normalized_slots: List[str]) -> Dict[str, Any]:
+    """Return collected slots plus a lowercased `<slot>_lc` copy of each normalized slot"""
+    values = dict(collected)
+    for slot in normalized_slots:
+        if slot in collected:
+            values[f"{slot}_lc"] = str(collected[slot]).lower()
+    return values
+
+def run_triage_prelude(prelude: List[Any], slot_values: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute shared conversions (`_tN`) once per turn into the slot values.
+    
+    A conversion that fails (slot missing or unparseable) leaves its name unset,
+    so only the rules that use it fail, as they would inline.
+    """
+    scope = {"__builtins__": SAFE_BUILTINS, **RULE_HELPERS}
+    for code in prelude:
+        try:
+            exec(code, scope, slot_values)
+        except Exception:
+            pass
+    return slot_values
+
+def evaluate_triage_rule(rule: Dict[str, Any], collected: Dict[str, Any], compiled=None) -> bool:
+    """Evaluate a single triage rule against collected data"""
+    expression = rule.get("expression", "False")
+    try:
+        if compiled is None:
+            compiled = compile_triage_rule(rule, "<rule>")
+        code, slot_names = compiled
+        # Safe evaluation with only the referenced slots as context
+        namespace = {name: collected[name] for name in slot_names if name in collected}
+        result = eval(code, {"__builtins__": SAFE_BUILTINS, **RULE_HELPERS}, namespace)
+        return bool(result)
+    except Exception as e:
+        print(f"⚠️ Error evaluating rule '{expression[:50]}...': {e}")
+        return False
@@ -0,0 +1,23 @@
+# urgency.py
+# Integer urgency levels behind the emoji-labelled complaint priorities and triage levels
+
+from enum import IntEnum
+from typing import Optional
+
+class Urgency(IntEnum):
+    YELLOW = 1  # Routine / medical evaluation recommended
+    ORANGE = 2  # Urgent evaluation needed
+    RED = 3     # Immediate emergency care
+
+# Display labels kept for UX; compare and sort on the Urgency value instead
+URGENCY_LABELS = {
+    Urgency.YELLOW: "🟨 Yellow",
+    Urgency.ORANGE: "🟧 Orange",
+    Urgency.RED: "🟥 Red"
+}
+
+LABEL_TO_URGENCY = {label: level for level, label in URGENCY_LABELS.items()}
+
+def urgency_of(label: Optional[str], default: Urgency = Urgency.YELLOW) -> Urgency:
+    """Map a display label such as "🟥 Red" to its Urgency"""
+    return LABEL_TO_URGENCY.get(label, default)
@@ -0,0 +1,31 @@
+import pytest
+
+from medical_knowledge.chest_pain import _term_bits, analyze_chest_pain_symptoms, analyze_chest_pain_symptoms_batch
+
+DESCRIPTIONS = ["crushing chest pressure radiating to my left arm", "sharp pain when I breathe in"]
+RISK_FACTORS = [["smoking", "diabetes"], ["recent surgery"]]
+
+def test_batch_matches_single_patient_analysis():
+    batch = analyze_chest_pain_symptoms_batch(DESCRIPTIONS, RISK_FACTORS)
+    assert batch == [
+        analyze_chest_pain_symptoms({"description": description}, {"risk_factors": risk_factors})
+        for description, risk_factors in zip(DESCRIPTIONS, RISK_FACTORS)
+    ]
+
+@pytest.mark.parametrize("descriptions, risk_factors_list", [
+    (DESCRIPTIONS, RISK_FACTORS[:1]),
+    (DESCRIPTIONS[:1], RISK_FACTORS),
+    ([], RISK_FACTORS[:1]),
+    (DESCRIPTIONS[:1], [])
+])
+def test_batch_rejects_mismatched_lengths(descriptions, risk_factors_list):
+    with pytest.raises(ValueError):
+        analyze_chest_pain_symptoms_batch(descriptions, risk_factors_list)
+
+def test_empty_batch():
+    assert analyze_chest_pain_symptoms_batch([], []) == []
+
+def test_term_masks_reject_more_than_64_terms():
+    assert _term_bits([f"term {i}" for i in range(64)], "symptom")["term 63"] == 1 << 63
+    with pytest.raises(ValueError):
+        _term_bits([f"term {i}" for i in range(65)], "symptom")
@@ -0,0 +1,23 @@
+import json
+
+import generate_complaints
+from symptom_intelligence.complaint_loader import load_complaints
+from symptom_intelligence.triage_rules import compile_all_triage_functions
+
+def test_generated_bundle_reaches_the_loader(tmp_path):
+    generate_complaints.write_bundle(str(tmp_path))
+    loaded = load_complaints(str(tmp_path))
+
+    expected = {data["chief_complaint"].lower() for data in generate_complaints.complaints.values()}
+    assert set(loaded) == expected
+    # Every bundled complaint carries a triage function whose digest matches its rules
+    assert set(compile_all_triage_functions(loaded)) == expected
+
+def test_per_complaint_file_overrides_the_bundle(tmp_path):
+    generate_complaints.write_bundle(str(tmp_path))
+    bundled = next(iter(generate_complaints.complaints.values()))
+    override = {"chief_complaint": bundled["chief_complaint"], "slots": [], "triage_rules": []}
+    (tmp_path / "override.json").write_text(json.dumps(override), encoding="utf-8")
+
+    loaded = load_complaints(str(tmp_path))
+    assert loaded[bundled["chief_complaint"].lower()] == override
@@ -0,0 +1,20 @@
+import datetime
+
+import pytest
+
+from medical_knowledge.emergency_department_handbook import EDMedicalKnowledge
+
+@pytest.mark.parametrize("response", [
+    {"seen_at": datetime.datetime(2024, 1, 1)},
+    {"tags": {"fever", "chills"}},
+    {1: "int key", "str": "key"},
+    {"note": object()}
+])
+def test_store_successful_pattern_accepts_any_response(response):
+    knowledge = EDMedicalKnowledge()
+    knowledge.store_successful_pattern("fever and chills", response, 5)
+    knowledge.store_successful_pattern("fever and chills", response, 4)
+    
+    insights = knowledge.get_learning_insights()
+    assert insights["total_responses_evaluated"] == 2
+    assert insights["most_common_patterns"] == [{"pattern": "fever", "usage_count": 2}]
@@ -0,0 +1,19 @@
+import pytest
+
+from medical_knowledge.ed_systems_framework import identify_medical_system, identify_medical_systems_batch
+
+@pytest.mark.parametrize("message, expected", [
+    ("hi, I have chest pain", ["cardiovascular"]),
+    ("Good morning! I have a headache", ["neurological"]),
+    ("hello", "greeting"),
+    # "hi" at the start of a word is not a greeting to strip
+    ("hives and swelling of my throat", "greeting"),
+    ("hip pain", "greeting"),
+    ("history of asthma and now shortness of breath", "greeting")
+])
+def test_leading_greeting_is_stripped_only_at_a_word_boundary(message, expected):
+    assert identify_medical_system(message) == expected
+
+def test_batch_matches_single_message_classification():
+    messages = ["hi, I have chest pain", "hives and swelling of my throat", "hip pain", "thanks"]
+    assert identify_medical_systems_batch(messages) == [identify_medical_system(message) for message in messages]
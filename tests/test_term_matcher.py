@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from medical_knowledge._matcher import TermMatcher
+
+TERMS = [("chest pain", 1), ("pain", 2), ("ain", 4), ("sweating", 8), ("no sweating", 16), ("pain", 32)]
+
+def _expected(text):
+    """OR of the masks of every term occurring in text, by plain substring tests"""
+    mask = 0
+    for term, term_mask in TERMS:
+        if term in text:
+            mask |= term_mask
+    return mask
+
+def _texts():
+    rng = random.Random(0)
+    words = ["chest", "pain", "no", "sweating", "ain", "p", "c", "", "\x00"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(0, 6))) for _ in range(500)]
+
+@pytest.fixture(params=["automaton", "regex"])
+def matcher(request):
+    matcher = TermMatcher(TERMS)
+    if request.param == "regex":
+        matcher.automaton = None
+    return matcher
+
+def test_scan_matches_substring_semantics(matcher):
+    for text in _texts():
+        assert matcher.scan(text) == _expected(text)
+
+def test_scan_many_matches_scan(matcher):
+    texts = _texts()
+    assert matcher.scan_many(texts) == [_expected(text) for text in texts]
+    assert matcher.scan_many([]) == []
+
+def test_from_terms_assigns_one_bit_per_distinct_term():
+    matcher = TermMatcher.from_terms(["fever", "chills", "fever"])
+    assert matcher.masks == {"fever": 1, "chills": 2}
+    assert matcher.mask(["chills", "fever"]) == 3
+
+def test_empty_vocabulary_matches_nothing():
+    matcher = TermMatcher([])
+    assert matcher.scan("anything") == 0
+    assert matcher.scan_many(["a", "b"]) == [0, 0]
@@ -0,0 +1,64 @@
+import ast
+import copy
+import random
+
+import pytest
+
+import generate_complaints
+from symptom_intelligence.triage_rules import (
+    compile_all_triage_functions,
+    compile_all_triage_preludes,
+    compile_all_triage_rules,
+    evaluate_triage_rule,
+    normalize_slots,
+    run_triage_prelude
+)
+
+SLOT_VALUES = [
+    "", "  ", "yes", "no", "sudden", "gradual", "rest", "5", "7", "10", "about 5",
+    "3 minutes", "102.5", "102.5 f", "104", "102F", "38.5C", "40c", "ten", "-2",
+    "worst headache", "immunocompromised yes", "head injury", "blue lips"
+]
+
+def _slot_values_for(data):
+    """SLOT_VALUES plus every literal the complaint's rules compare against, so most rules can fire"""
+    literals = {
+        str(node.value)
+        for rule in data["triage_rules"]
+        for node in ast.walk(ast.parse(rule["expression"], mode="eval"))
+        if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float))
+    }
+    return SLOT_VALUES + sorted(literals)
+
+def _per_rule_match(data, compiled_rules, preludes, collected):
+    """Index of the first rule that matches when evaluated one by one, or None"""
+    slot_values = normalize_slots(collected, data.get("normalized_slots", []))
+    slot_values = run_triage_prelude(preludes, slot_values)
+    for i, rule in enumerate(data["triage_rules"]):
+        if compiled_rules[i] is not None and evaluate_triage_rule(rule, slot_values, compiled_rules[i]):
+            return i
+    return None
+
+@pytest.mark.parametrize("name", sorted(generate_complaints.complaints))
+def test_generated_triage_matches_per_rule_evaluation(name):
+    data = generate_complaints.complaints[name]
+    cc = data["chief_complaint"].lower()
+    complaints = {cc: data}
+    triage = compile_all_triage_functions(complaints)[cc]
+    compiled_rules = compile_all_triage_rules(complaints)[cc]
+    preludes = compile_all_triage_preludes(complaints).get(cc, [])
+    
+    values = _slot_values_for(data)
+    rng = random.Random(name)
+    for _ in range(2000):
+        collected = {slot: rng.choice(values) for slot in data["slots"] if rng.random() < 0.8}
+        slot_values = run_triage_prelude(preludes, normalize_slots(collected, data.get("normalized_slots", [])))
+        assert triage(slot_values) == _per_rule_match(data, compiled_rules, preludes, collected), collected
+
+def test_edited_rules_fall_back_to_per_rule_evaluation():
+    data = copy.deepcopy(generate_complaints.complaints["fever"])
+    cc = data["chief_complaint"].lower()
+    assert cc in compile_all_triage_functions({cc: data})
+    
+    data["triage_rules"][0]["expression"] = "False"
+    assert cc not in compile_all_triage_functions({cc: data})